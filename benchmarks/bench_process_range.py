@@ -0,0 +1,137 @@
+"""
+End-to-end process_range benchmark against the fake client
+Drives the real processor (scan, classify, journal, download/upload pipeline,
+status rendering) over message ranges of growing size and reports files/s,
+MB/s, time to the first download, peak RSS and event loop lag. Each range runs in its own process, so
+peak RSS belongs to that range alone.
+
+Usage: python benchmarks/bench_process_range.py [--messages 100,1000,10000,50000]
+           [--latency 0.001] [--bandwidth MB/s] [--flood-rate 0.0] [--sizes lognormal:2:1]
+           [--destinations 2] [--rate-limits]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE_CHANNEL = -100123
+LAG_INTERVAL = 0.01
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", default="100,1000,10000,50000", help="Comma separated range sizes")
+    parser.add_argument("--latency", type=float, default=0.001, help="Seconds per simulated API call")
+    parser.add_argument("--bandwidth", type=float, default=0, help="MB/s per transfer, 0 for instant")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="Chance of FloodWait per call")
+    parser.add_argument("--flood-seconds", type=int, default=1, help="FloodWait length")
+    parser.add_argument("--sizes", default="lognormal:2:1", help="fixed:MB, uniform:MB:MB or lognormal:MB:sigma")
+    parser.add_argument("--media-ratio", type=float, default=0.9, help="Share of messages with a file")
+    parser.add_argument("--destinations", type=int, default=2, help="Destination channels")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the configured API rate limits")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+async def lag_probe(samples: list):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL))
+
+async def run_range(args, messages: int) -> dict:
+    from bot.config import Config
+    from bot.database import start_flusher, stop_flusher
+    from bot.jobs import Job
+    from bot.processor import process_range
+    from bot import journal
+    from fake_client import FakeClient, FakeStatusMessage
+    
+    Config.DESTINATION_CHANNEL_IDS = [-1001000000001 - i for i in range(args.destinations)]
+    if not args.rate_limits:
+        # Measure the processor, not the token buckets
+        Config.API_RATE_LIMITS = {"default": (1e9, 1e9)}
+        Config.CHAT_RATE_LIMIT = Config.GROUP_RATE_LIMIT = (1e9, 1e9)
+        Config.STATUS_EDITS_PER_MINUTE = 1e9
+    
+    client = FakeClient(
+        latency=args.latency,
+        bandwidth=args.bandwidth * 1024 * 1024,
+        flood_rate=args.flood_rate,
+        flood_seconds=args.flood_seconds,
+        sizes=args.sizes,
+        media_ratio=args.media_ratio,
+    )
+    status = FakeStatusMessage()
+    start_link = f"https://t.me/c/{str(SOURCE_CHANNEL)[4:]}/1"
+    end_link = f"https://t.me/c/{str(SOURCE_CHANNEL)[4:]}/{messages}"
+    
+    start_flusher()
+    samples = []
+    probe = asyncio.create_task(lag_probe(samples))
+    
+    job_id = await journal.create_job(SOURCE_CHANNEL, start_link, end_link)
+    job = Job(job_id, SOURCE_CHANNEL, start_link, end_link, status)
+    started = time.perf_counter()
+    _, summary = await process_range(client, job)
+    elapsed = time.perf_counter() - started
+    
+    probe.cancel()
+    await stop_flusher()
+    
+    samples.sort()
+    files = job.state['processed']
+    return {
+        "messages": messages,
+        "files": files,
+        "seconds": elapsed,
+        "first_file_seconds": (client.first_download_at or started) - started,
+        "files_per_second": files / elapsed,
+        "mb_per_second": client.bytes_down / elapsed / (1024 * 1024),
+        "sends": client.sent,
+        "status_edits": status.edits,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "lag_p50_ms": samples[len(samples) // 2] * 1000 if samples else 0,
+        "lag_p99_ms": samples[int(len(samples) * 0.99)] * 1000 if samples else 0,
+        "lag_max_ms": samples[-1] * 1000 if samples else 0,
+        "summary": summary.replace("\n", " ") if summary else "",
+    }
+
+def run_in_process(argv: list, messages: int) -> dict:
+    """One range in a fresh interpreter and scratch directory"""
+    with tempfile.TemporaryDirectory() as workdir:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *argv, "--run", str(messages)],
+            cwd=workdir, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    argv = sys.argv[1:]
+    args = parse_args(argv)
+    
+    if args.run:
+        # Child process: the database and downloads live in the cwd
+        result = asyncio.run(run_range(args, args.run))
+        print(json.dumps(result))
+        return
+    
+    print(f"latency {args.latency * 1000:g} ms, bandwidth {args.bandwidth or 'unlimited'} MB/s, "
+          f"FloodWait rate {args.flood_rate:g}, sizes {args.sizes}, {args.destinations} destinations")
+    print(f"{'messages':>9} {'files':>7} {'seconds':>8} {'first':>7} {'files/s':>8} {'MB/s':>9} "
+          f"{'edits':>6} {'RSS MB':>7} {'lag p50':>8} {'lag p99':>8} {'lag max':>8}")
+    for messages in [int(n) for n in args.messages.split(",")]:
+        r = run_in_process(argv, messages)
+        print(f"{r['messages']:>9} {r['files']:>7} {r['seconds']:>8.2f} {r['first_file_seconds']:>7.2f} "
+              f"{r['files_per_second']:>8.0f} "
+              f"{r['mb_per_second']:>9.0f} {r['status_edits']:>6} {r['peak_rss_mb']:>7.0f} "
+              f"{r['lag_p50_ms']:>6.1f}ms {r['lag_p99_ms']:>6.1f}ms {r['lag_max_ms']:>6.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Queue record memory benchmark
+Builds N scanned files twice - as the old queue dicts holding the pyrogram
+Message, and as QueueItem records with the message dropped - and reports the
+memory each queue keeps alive (tracemalloc), in total and per file.
+
+Usage: python benchmarks/bench_queue_memory.py [--items 10000,50000]
+"""
+import os
+import sys
+import argparse
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyrogram import types, enums
+from pyrogram.parser.utils import add_surrogates
+from bot.filters import get_file_name, get_file_id, get_file_unique_id
+from bot.queue import QueueItem
+
+CHAT_ID = -1001234567890
+FILE_ID = "BQACAgUAAx0CZ7Yx1wACAQ5m{:08d}QwAB3zXq9kL2mRvYAAIbDgACXx5BVaT0m0bSg1yNHgQ"
+THUMB_ID = "AAMCBQADHQJntjHXAAIBDmb{:08d}AAd6Neq9kvZq5G9gACGw4AAl8eQVWk9JtG0oNcjQEAB20AAx4E"
+
+def channel_chat() -> types.Chat:
+    return types.Chat(id=CHAT_ID, type=enums.ChatType.CHANNEL, title="Source Channel", username="source")
+
+def scanned_message(msg_id: int) -> types.Message:
+    """A channel post the way get_messages returns it, with a thumbnail and a caption"""
+    name = f"Movie.{msg_id}.2024.1080p.WEB-DL.DDP5.1.x264.mkv"
+    caption = f"{name}\n\nTamil + Telugu | 2.1 GB | #movies"
+    document = types.Document(
+        file_id=FILE_ID.format(msg_id),
+        file_unique_id=f"AgADGw4AAl8e{msg_id:08d}",
+        file_name=name,
+        mime_type="video/x-matroska",
+        file_size=2_254_857_830,
+        date=datetime(2024, 5, 1),
+        thumbs=[types.Thumbnail(
+            file_id=THUMB_ID.format(msg_id),
+            file_unique_id=f"AQADGw4AAl8e{msg_id:08d}",
+            width=320, height=180, file_size=12_345
+        )]
+    )
+    return types.Message(
+        id=msg_id,
+        chat=channel_chat(),
+        sender_chat=channel_chat(),
+        date=datetime(2024, 5, 1),
+        document=document,
+        caption=types.messages_and_media.message.Str(caption).init([
+            types.MessageEntity(type=enums.MessageEntityType.HASHTAG, offset=len(add_surrogates(caption)) - 7, length=7)
+        ]),
+        views=1234,
+        outgoing=False,
+    )
+
+def dict_item(msg: types.Message) -> dict:
+    """Queue entry as it was built before QueueItem"""
+    name = get_file_name(msg)
+    return {
+        'msg_id': msg.id,
+        'msg': msg,
+        'name': name.replace(".", " ", 3),
+        'premium': True,
+        'split': False,
+        'file_size': msg.document.file_size,
+        'original_name': name,
+        'skip_reason': None,
+        'destinations': None,
+        'file_unique_id': get_file_unique_id(msg),
+    }
+
+def record_item(msg: types.Message) -> QueueItem:
+    name = get_file_name(msg)
+    return QueueItem(
+        msg.id,
+        msg.chat.id,
+        get_file_id(msg),
+        get_file_unique_id(msg),
+        msg.document.file_size,
+        name.replace(".", " ", 3),
+        name,
+        caption=str(msg.caption) if msg.caption else None,
+        premium=True
+    )
+
+def measure(count: int, build) -> int:
+    """Bytes a queue of count items keeps alive once the scanned messages are gone"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    queue = [build(scanned_message(msg_id)) for msg_id in range(1, count + 1)]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del queue
+    return retained
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--items", default="10000,50000", help="Comma separated queue sizes")
+    args = parser.parse_args()
+    
+    print(f"{'items':>7} {'dict+Message MB':>16} {'QueueItem MB':>13} {'B/item before':>14} {'B/item after':>13} {'saved':>6}")
+    for count in [int(n) for n in args.items.split(",")]:
+        before = measure(count, dict_item)
+        after = measure(count, record_item)
+        print(f"{count:>7} {before / 1024 / 1024:>16.1f} {after / 1024 / 1024:>13.1f} "
+              f"{before / count:>14.0f} {after / count:>13.0f} {1 - after / before:>6.0%}")
+
+if __name__ == "__main__":
+    main()
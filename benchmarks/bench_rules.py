@@ -0,0 +1,146 @@
+"""
+Rename/filter rule engine micro-benchmark
+Compares the compiled RuleSet against the old per-call implementation
+
+Usage: python benchmarks/bench_rules.py [files] [words]
+"""
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.config import Config
+from bot.filters import classify_files, rename_file, should_process_file
+
+RELEASE_NAMES = [
+    "www.1TamilMV.world - Leo (2023) Tamil HQ HDRip - 1080p - x264 - (DD+5.1 - 192Kbps & AAC) - 2.5GB - ESub.mkv",
+    "@MoviesHub_Official Jawan.2023.Hindi.1080p.NF.WEB-DL.DDP5.1.Atmos.H.264-HDHub4u.mkv",
+    "Kalki_2898_AD_(2024)_Telugu_TRUE_WEB-DL_-_720p_-_AVC_-_(DD+5.1_-_640Kbps_&_AAC)_-_1.4GB_-_ESub.mkv",
+    "The.Boys.S04E05.Beware.the.Jabberwock.My.Son.1080p.AMZN.WEB-DL.DDP5.1.H.264-NTb.mkv",
+    "[Telly] Premalu (2024) Malayalam 480p HQ HDRip x264 AAC 450MB [@CC_Links].mkv",
+    "Kantara.2022.Kannada.2160p.4K.WEB-DL.HEVC.10bit.DDP5.1-TheMoviesBoss.mkv",
+    "Pushpa 2 The Rule (2024) [Tamil + Telugu + Hindi] 1080p HQ HDRip x264 DD5.1 3.2GB ESub @TamilBlasters.mkv",
+    "Animal_2023_Hindi_ORG_1080p_NF_WEB-DL_DDP5.1_HEVC_x265_@Bollyflix.mkv",
+    "Mirzapur.S03E01.720p.AMZN.WEB-DL.Hindi.DDP5.1.H.264-TVSHOWS.mkv",
+    "Chamkila (2024) Punjabi 720p NF WEB-DL x264 AAC ESub [@PunjabiCinema].mp4",
+    "Manjummel.Boys.2024.Malayalam.1080p.DSNP.WEB-DL.DD+5.1.H.264.MSub-Telly.mkv",
+    "Salaar.Part.1.Ceasefire.2023.Multi.Audio.[Tamil+Telugu+Kannada+Malayalam+Hindi].1080p.WEB-DL.mkv",
+    "Oppenheimer.2023.IMAX.2160p.UHD.BluRay.REMUX.HDR.HEVC.TrueHD.7.1.Atmos-FGT.mkv",
+    "www.1TamilMV.fi - Vettaiyan (2024) Tamil TRUE WEB-DL - 4K SDR - HEVC - (DD+5.1 - 640Kbps) - 12GB.mkv",
+    "Shogun.2024.S01E10.A.Dream.of.a.Dream.2160p.DSNP.WEB-DL.DDP5.1.DV.HDR.H.265-NTb.mkv",
+    "@Anime_Fever Jujutsu_Kaisen_S02E23_1080p_CR_WEB-DL_AAC2.0_H.264_Dual_Audio_ESub.mkv",
+    "Stree 2 (2024) Hindi HDTS 480p x264 AAC 400MB HSub.mkv",
+    "Devara.Part.1.2024.Telugu.1080p.NF.WEB-DL.DDP5.1.Atmos.x264.TeSub-HDHub4u.mkv",
+    "Aavesham (2024) [Malayalam] 720p HDRip x264 AAC 1.2GB MSub [@MallumvOfficial].mkv",
+    "Sample_Trailer_Teaser_Promo_2024_1080p.mp4",
+]
+
+LEGACY_RE_USERNAME = r'@\w+'
+LEGACY_RE_TAMILMV = r'www\.1tamilmv\.\S+\s*'
+
+def legacy_should_process(file_name):
+    if not file_name:
+        return False, "No file name found"
+    name_lower = file_name.lower()
+    if Config.BLACKLIST_WORDS:
+        for word in Config.BLACKLIST_WORDS:
+            if word in name_lower:
+                return False, f"Blacklisted word: {word}"
+    if Config.WHITELIST_WORDS:
+        found = False
+        for word in Config.WHITELIST_WORDS:
+            if word in name_lower:
+                found = True
+                break
+        if not found:
+            return False, "No whitelist word found"
+    return True, "OK"
+
+def legacy_rename(original_name):
+    import re
+    if not original_name:
+        return original_name
+    name_parts = original_name.rsplit('.', 1)
+    if len(name_parts) == 2:
+        base_name, extension = name_parts
+    else:
+        base_name = original_name
+        extension = None
+    base_name = base_name.replace('_', ' ')
+    if Config.REMOVE_USERNAME:
+        base_name = re.sub(LEGACY_RE_USERNAME, '', base_name)
+    base_name = re.sub(LEGACY_RE_TAMILMV, '', base_name)
+    if Config.REMOVED_WORDS:
+        for word in Config.REMOVED_WORDS:
+            base_name = base_name.replace(word, '')
+    base_name = re.sub(r'\s+', ' ', base_name)
+    base_name = base_name.strip()
+    if base_name:
+        new_name = f"{Config.FILE_PREFIX}{base_name}{Config.FILE_SUFFIX}"
+    else:
+        new_name = original_name
+    if extension:
+        new_name = f"{new_name}.{extension}"
+    return new_name
+
+def build_corpus(count):
+    rng = random.Random(42)
+    corpus = []
+    for i in range(count):
+        name = rng.choice(RELEASE_NAMES)
+        # Vary titles a little so results can't be cached by name
+        corpus.append(name.replace("2024", str(1990 + i % 40), 1).replace("1080p", rng.choice(["480p", "720p", "1080p"]), 1))
+    return corpus
+
+COMMON_REMOVED = [
+    "www.1TamilMV.world -", "www.1TamilMV.fi -", "HDHub4u", "TamilBlasters", "Bollyflix", "TheMoviesBoss",
+    "[Telly]", "-Telly", "[@CC_Links]", "[@PunjabiCinema]", "[@MallumvOfficial]", "TRUE", "HQ", "ORG",
+]
+
+def build_word_lists(count):
+    """Realistic removal tags padded with channel-style tags up to count entries"""
+    rng = random.Random(7)
+    removed = list(COMMON_REMOVED)
+    while len(removed) < count:
+        removed.append(rng.choice(["@", "[", "-"]) + rng.choice(["Movies", "Cinema", "Links", "Hub", "TV"]) + str(len(removed)))
+    blacklist = [w.lower().strip("@[-") + "cam" for w in removed] + ["trailer", "teaser", "sample"]
+    return removed[:count], blacklist
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000:9.1f} ms")
+    return result, elapsed
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    words = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    
+    corpus = build_corpus(files)
+    Config.REMOVED_WORDS, Config.BLACKLIST_WORDS = build_word_lists(words)
+    Config.WHITELIST_WORDS = []
+    Config.REMOVE_USERNAME = True
+    
+    print(f"{files} files, {len(Config.REMOVED_WORDS)} removed words, {len(Config.BLACKLIST_WORDS)} blacklist words")
+    
+    legacy, legacy_time = timed("legacy per-file", lambda: [
+        (legacy_rename(n), *legacy_should_process(n)) for n in corpus
+    ])
+    single, _ = timed("RuleSet per-file", lambda: [
+        (rename_file(n), *should_process_file(n)) for n in corpus
+    ])
+    batch, batch_time = timed("RuleSet batch", lambda: classify_files(corpus))
+    
+    # Single-pass removal differs from chained str.replace only when removing
+    # one word creates another; report it instead of asserting equality
+    rename_diff = sum(1 for a, b in zip(legacy, batch) if a[0] != b[0])
+    skip_diff = sum(1 for a, b in zip(legacy, batch) if a[1] != b[1])
+    print(f"  renames differing: {rename_diff}, skip decisions differing: {skip_diff}")
+    print(f"  speedup (batch vs legacy): {legacy_time / batch_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
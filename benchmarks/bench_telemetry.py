@@ -0,0 +1,114 @@
+"""
+Progress callback micro-benchmark
+Per-call cost of the old dict-based progress closure against TransferStats,
+and of pyrogram's thread pool hop for sync callbacks against an async one
+
+Usage: python benchmarks/bench_telemetry.py [calls]
+"""
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.telemetry import JobStats, TransferStats
+
+CHUNK = 1024 * 1024
+
+def legacy_progress(current_status):
+    """Old upload_progress closure - global dict writes and time.time()"""
+    def progress(current, total):
+        if current_status['cancel_all']:
+            return
+        current_status['current_size'] = current
+        current_status['total_size'] = total
+        
+        now = time.time()
+        elapsed = now - current_status['last_update_time']
+        
+        if elapsed > 0.5:
+            speed = (current - current_status['last_bytes']) / elapsed
+            current_status['speed'] = speed
+            current_status['last_bytes'] = current
+            current_status['last_update_time'] = now
+    
+    return progress
+
+def bench_legacy(calls: int) -> float:
+    current_status = {
+        'cancel_all': False, 'current_size': 0, 'total_size': 0,
+        'speed': 0, 'last_bytes': 0, 'last_update_time': time.time(),
+    }
+    progress = legacy_progress(current_status)
+    total = calls * CHUNK
+    
+    start = time.perf_counter()
+    for i in range(1, calls + 1):
+        progress(i * CHUNK, total)
+    return time.perf_counter() - start
+
+def bench_stats(calls: int) -> float:
+    state = {'cancel_all': False}
+    transfer = TransferStats("bench.mkv", JobStats())
+    transfer.begin('downloading', calls * CHUNK)
+    changed = 0
+    
+    # Same shape as processor.make_progress, minus the coroutine
+    def progress(current, total):
+        nonlocal changed
+        if state['cancel_all']:
+            return
+        if transfer.update(current, total):
+            changed += 1
+    
+    total = calls * CHUNK
+    start = time.perf_counter()
+    for i in range(1, calls + 1):
+        progress(i * CHUNK, total)
+    return time.perf_counter() - start
+
+async def bench_dispatch(calls: int) -> tuple[float, float]:
+    """pyrogram runs sync callbacks in its executor, awaits async ones"""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    transfer = TransferStats("bench.mkv", JobStats())
+    transfer.begin('downloading', calls * CHUNK)
+    
+    def sync_progress(current, total):
+        transfer.update(current, total)
+    
+    async def async_progress(current, total):
+        transfer.update(current, total)
+    
+    start = time.perf_counter()
+    for i in range(1, calls + 1):
+        await loop.run_in_executor(executor, sync_progress, i * CHUNK, calls * CHUNK)
+    threaded = time.perf_counter() - start
+    
+    transfer.begin('downloading', calls * CHUNK)
+    start = time.perf_counter()
+    for i in range(1, calls + 1):
+        await async_progress(i * CHUNK, calls * CHUNK)
+    awaited = time.perf_counter() - start
+    
+    executor.shutdown()
+    return threaded, awaited
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    
+    legacy = min(bench_legacy(calls) for _ in range(3))
+    stats = min(bench_stats(calls) for _ in range(3))
+    threaded, awaited = asyncio.run(bench_dispatch(calls // 10))
+    
+    print(f"{calls} progress calls")
+    print(f"  legacy dict closure : {legacy / calls * 1e9:8.0f} ns/call")
+    print(f"  TransferStats       : {stats / calls * 1e9:8.0f} ns/call  (EWMA, job totals, ETA)")
+    print(f"{calls // 10} dispatched callbacks")
+    print(f"  sync via executor   : {threaded / (calls // 10) * 1e9:8.0f} ns/call")
+    print(f"  async, awaited      : {awaited / (calls // 10) * 1e9:8.0f} ns/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Fake Telegram client for offline benchmarks
+Stands in for the pyrogram Client used by bot/processor.py: get_messages,
+download_media, stream_media and send_document with simulated latency,
+bandwidth, FloodWait and file sizes. Calls go through a RateLimiter like
+RateLimitedClient.invoke, so injected FloodWaits are penalized and retried
+the way production calls are.
+"""
+import os
+import math
+import random
+import time
+import asyncio
+from pyrogram.errors import FloodWait
+from bot.ratelimit import RateLimiter
+
+MB = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+def parse_sizes(spec: str):
+    """File size sampler from a spec
+    
+    fixed:<MB>                 every file the same size
+    uniform:<min MB>:<max MB>  evenly spread
+    lognormal:<median MB>:<sigma>  long tail, like real channels
+    """
+    kind, *args = spec.split(":")
+    args = [float(arg) for arg in args]
+    if kind == "fixed":
+        size = int(args[0] * MB)
+        return lambda rng: size
+    if kind == "uniform":
+        low, high = int(args[0] * MB), int(args[1] * MB)
+        return lambda rng: rng.randint(low, high)
+    if kind == "lognormal":
+        mu, sigma = math.log(args[0] * MB), args[1]
+        return lambda rng: max(1, int(rng.lognormvariate(mu, sigma)))
+    raise ValueError(f"Unknown size distribution: {spec}")
+
+class FakeChat:
+    __slots__ = ('id',)
+    
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+
+class FakeDocument:
+    __slots__ = ('file_name', 'file_size', 'file_id', 'file_unique_id')
+    
+    def __init__(self, file_name: str, file_size: int, file_id: str):
+        self.file_name = file_name
+        self.file_size = file_size
+        self.file_id = file_id
+        self.file_unique_id = "u_" + file_id
+
+class FakeMessage:
+    __slots__ = ('id', 'chat', 'document', 'video', 'audio', 'photo', 'caption', 'empty')
+    
+    def __init__(self, chat_id: int, msg_id: int, document: FakeDocument = None, caption: str = None):
+        self.id = msg_id
+        self.chat = FakeChat(chat_id)
+        self.document = document
+        self.video = self.audio = self.photo = None
+        self.caption = caption
+        self.empty = False
+    
+    @property
+    def link(self) -> str:
+        return f"https://t.me/c/{str(self.chat.id)[4:]}/{self.id}"
+
+class FakeStatusMessage:
+    """Status message that only counts its edits"""
+    
+    def __init__(self):
+        self.edits = 0
+        self.text = ""
+    
+    async def edit_text(self, text, **kwargs):
+        self.edits += 1
+        self.text = text
+    
+    async def reply_text(self, text, **kwargs):
+        self.text = text
+
+class FakeClient:
+    """Simulated Telegram client
+    
+    latency: seconds added to every API call and before every transfer
+    bandwidth: bytes per second of one transfer, 0 for instant transfers
+    flood_rate: chance that a call raises FloodWait(flood_seconds)
+    sizes: size spec for parse_sizes
+    media_ratio: share of messages that carry a document
+    """
+    
+    def __init__(self, latency: float = 0.001, bandwidth: float = 0, flood_rate: float = 0.0,
+                 flood_seconds: int = 1, sizes: str = "lognormal:2:1", media_ratio: float = 0.9,
+                 seed: int = 1):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.sample_size = parse_sizes(sizes)
+        self.media_ratio = media_ratio
+        self.seed = seed
+        self.limiter = RateLimiter()
+        self.name = "fake"
+        self.calls = {}
+        self.sent = 0
+        self.bytes_down = 0
+        self.bytes_up = 0
+        self.first_download_at = None
+        self.next_id = 1
+    
+    # ============ SIMULATION ============
+    
+    def message(self, chat_id: int, msg_id: int) -> FakeMessage:
+        """Same message for the same id on every call, like a real channel"""
+        rng = random.Random(self.seed * 1_000_003 + msg_id)
+        if rng.random() >= self.media_ratio:
+            return FakeMessage(chat_id, msg_id, caption=f"Text post {msg_id}")
+        name = f"Movie.{msg_id}.2024.1080p.WEB-DL.x264.mkv"
+        return FakeMessage(chat_id, msg_id, FakeDocument(name, self.sample_size(rng), f"file_{msg_id}"))
+    
+    def media_size(self, media) -> int:
+        """Size behind a message or a file_id, both are accepted like in pyrogram"""
+        if isinstance(media, str):
+            return self.message(0, int(media.rsplit("_", 1)[1])).document.file_size
+        return media.document.file_size
+    
+    async def api(self, method: str, func, *args, chat_id: int = None):
+        """One API call through the limiter, with latency and FloodWait injection"""
+        self.calls[method] = self.calls.get(method, 0) + 1
+        
+        async def attempt():
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.flood_rate and random.random() < self.flood_rate:
+                raise FloodWait(value=self.flood_seconds)
+            return await func(*args)
+        
+        return await self.limiter.call(method, attempt, chat_id=chat_id)
+    
+    async def transfer(self, size: int, progress=None):
+        """Move size bytes at the simulated bandwidth, reporting per chunk"""
+        if not self.bandwidth:
+            if progress:
+                await report(progress, size, size)
+            return
+        done = 0
+        while done < size:
+            step = min(CHUNK_SIZE, size - done)
+            await asyncio.sleep(step / self.bandwidth)
+            done += step
+            if progress:
+                await report(progress, done, size)
+    
+    # ============ CLIENT API ============
+    
+    async def get_messages(self, chat_id: int, message_ids):
+        async def fetch():
+            if isinstance(message_ids, int):
+                return self.message(chat_id, message_ids)
+            return [self.message(chat_id, msg_id) for msg_id in message_ids]
+        return await self.api("GetMessages", fetch)
+    
+    def download_started(self):
+        if self.first_download_at is None:
+            self.first_download_at = time.perf_counter()
+    
+    async def download_media(self, message: FakeMessage | str, file_name: str = None, progress=None, **kwargs):
+        self.download_started()
+        
+        async def download():
+            size = self.media_size(message)
+            await self.transfer(size, progress)
+            self.bytes_down += size
+            directory = os.path.dirname(file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Sparse file - the right size without writing the bytes
+            with open(file_name, "wb") as f:
+                f.truncate(size)
+            return os.path.abspath(file_name)
+        return await self.api("GetFile", download)
+    
+    async def stream_media(self, message: FakeMessage | str, limit: int = 0, offset: int = 0):
+        self.calls["GetFile"] = self.calls.get("GetFile", 0) + 1
+        self.download_started()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        size = self.media_size(message)
+        total_chunks = math.ceil(size / CHUNK_SIZE)
+        end = min(total_chunks, offset + limit) if limit else total_chunks
+        for index in range(offset, end):
+            length = min(CHUNK_SIZE, size - index * CHUNK_SIZE)
+            if self.bandwidth:
+                await asyncio.sleep(length / self.bandwidth)
+            self.bytes_down += length
+            yield bytes(length)
+    
+    async def send_document(self, chat_id: int, document, caption: str = "", thumb=None, progress=None, **kwargs):
+        async def send():
+            if isinstance(document, str) and os.path.exists(document):
+                size = os.path.getsize(document)
+                await self.transfer(size, progress)
+                self.bytes_up += size
+                file_id = f"up_{self.next_id}"
+            else:
+                # Re-post of an uploaded file_id, no bytes move
+                file_id = document
+            self.next_id += 1
+            self.sent += 1
+            return FakeMessage(chat_id, self.next_id, FakeDocument(os.path.basename(str(document)), 0, file_id), caption)
+        return await self.api("SendMedia", send, chat_id=chat_id)
+
+async def report(progress, current: int, total: int):
+    result = progress(current, total)
+    if asyncio.iscoroutine(result):
+        await result
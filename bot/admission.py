@@ -0,0 +1,75 @@
+"""
+Admission control - downloads start only when they fit on disk
+Every admitted file reserves its size until its local copy is removed. A file
+is admitted when the reservations stay within SPOOL_BUDGET and the free space
+in DOWNLOAD_DIR covers it (plus MIN_FREE_SPACE). One budget is shared by all
+jobs, waiters are served first come, first served.
+"""
+import os
+import asyncio
+import shutil
+from bot.config import Config
+
+ORDER_POLICIES = ("source", "smallest", "largest")
+
+class DiskFull(OSError):
+    """A file can never fit, even with nothing else on disk"""
+
+def free_space(path: str) -> int:
+    # The download folder may not exist yet, measure the nearest parent
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free
+
+def next_admission(window: list, policy: str = None) -> int:
+    """Index of the scanned file the feeder admits next"""
+    policy = policy or Config.ADMISSION_ORDER
+    if policy == "smallest":
+        return min(range(len(window)), key=lambda i: window[i].file_size)
+    if policy == "largest":
+        return max(range(len(window)), key=lambda i: window[i].file_size)
+    return 0
+
+class DiskBudget:
+    def __init__(self):
+        self.reserved = 0
+        self.files = 0
+        self._waiters = []
+    
+    def fits(self, size: int) -> bool:
+        budget = Config.SPOOL_BUDGET
+        if budget and self.files and self.reserved + size > budget:
+            return False
+        # Reserved files may not be written yet, so their space still counts
+        return free_space(Config.DOWNLOAD_DIR) - self.reserved - Config.MIN_FREE_SPACE >= size
+    
+    async def acquire(self, size: int, on_wait=None):
+        """Reserve size bytes, waiting for other files to be released until they fit
+        
+        A file bigger than SPOOL_BUDGET is admitted alone. DiskFull is raised
+        when a file does not fit even with nothing else reserved.
+        """
+        waited = False
+        while not self.fits(size):
+            if not self.files:
+                raise DiskFull(f"Not enough disk space in {Config.DOWNLOAD_DIR} for {size} bytes")
+            if not waited and on_wait:
+                on_wait()
+            waited = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.reserved += size
+        self.files += 1
+    
+    def release(self, size: int):
+        self.reserved -= size
+        self.files -= 1
+        # Every waiter checks again, in the order they started waiting
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+disk_budget = DiskBudget()
@@ -7,6 +7,7 @@ import logging
 from pyrogram.client import Client
 from pyrogram.raw.functions.help import GetConfig
 from bot.config import Config
+from bot.ratelimit import RateLimiter, limiter, peer_chat_id
 
 logging.getLogger("pyrogram").setLevel(logging.WARNING)
 
@@ -33,11 +34,34 @@ class TimeSyncClient(Client):
         except:
             pass
 
-# Bot client - use standard Client with proper configuration
-app = Client(
+class RateLimitedClient(Client):
+    """Client whose API calls all go through a rate limiter
+    
+    FloodWait is per account, so helper sessions bring their own limiter.
+    """
+    
+    def __init__(self, *args, limiter: RateLimiter = limiter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+    
+    async def invoke(self, query, *args, **kwargs):
+        return await self.limiter.call(
+            type(query).__name__,
+            super().invoke,
+            query,
+            *args,
+            chat_id=peer_chat_id(query),
+            **kwargs
+        )
+
+# Bot client - FloodWait is never slept inside pyrogram (sleep_threshold=0),
+# the limiter waits it out so every caller sees the penalty
+app = RateLimitedClient(
     "bot_session",
     api_id=Config.API_ID,
     api_hash=Config.API_HASH,
     bot_token=Config.BOT_TOKEN,
-    workdir="."
+    workdir=".",
+    sleep_threshold=0,
+    max_concurrent_transmissions=Config.MAX_TRANSMISSIONS
 )
@@ -12,11 +12,87 @@ class Config:
     # ============ BOT SETTINGS ============
     DOWNLOAD_DIR = "downloads"
     THUMBNAIL_DIR = "thumbnails"
+    THUMBNAIL_RULES = {}      # "dest:<id>" / "source:<id>" -> thumbnail name (see /setthumb)
+    DATABASE_PATH = "bot_data.db"
+    DB_FLUSH_INTERVAL = 2     # Seconds between batched settings writes
     
     # ============ CHANNEL SETTINGS ============
     SOURCE_CHANNEL_IDS = []
     DESTINATION_CHANNEL_IDS = []
     
+    # ============ FILE SETTINGS ============
+    BLACKLIST_WORDS = []      # Skip files whose lowercase name contains any of these
+    WHITELIST_WORDS = []      # If set, only process files containing one of these
+    REMOVED_WORDS = []        # Removed from file names (case-sensitive)
+    REMOVE_USERNAME = True    # Strip @username tags from file names
+    FILE_PREFIX = ""
+    FILE_SUFFIX = ""
+    CUSTOM_CAPTION = ""       # Caption template, empty for the default
+    PROCESS_ABOVE_2GB = False # Process files above 2GB (needs Premium)
+    SPLIT_LARGE_FILES = False # Post files too big to upload as .001/.002 volumes
+    SPLIT_PART_SIZE = 2000 * 1024 * 1024  # Volume size (bot upload limit is 2000 MiB)
+    SKIP_DUPLICATES = True    # Skip files already delivered to a destination
+    
+    # ============ WATCH MODE ============
+    WATCH_MODE = False        # Process new posts in the source channels automatically
+    WATCH_BATCH_SIZE = 20     # Queue a batch once this many posts arrived
+    WATCH_DEBOUNCE = 5        # ...or once no post arrived for this many seconds
+    WATCH_MAX_DELAY = 30      # ...or at the latest this many seconds after its first post
+    WATCH_PRIORITY = 10       # Job priority of watched batches (manual ranges use 0)
+    
+    # ============ SCAN SETTINGS ============
+    SCAN_BATCH_SIZE = 200     # Message IDs per get_messages call (Telegram max is 200)
+    SCAN_CONCURRENCY = 4      # Parallel get_messages calls while scanning a range
+    PIPELINE_BUFFER = 1000    # Scanned files buffered ahead of the transfers
+    
+    # ============ TRANSFER SETTINGS ============
+    MAX_CONCURRENT_JOBS = 2   # Range jobs running at the same time
+    DOWNLOAD_WORKERS = 2      # Files downloading at the same time
+    UPLOAD_WORKERS = 2        # Files uploading at the same time
+    MAX_FILES_IN_FLIGHT = 3   # Files admitted between download start and upload end
+    PRESERVE_ORDER = True     # Post files to destinations in source (admission) order
+    ADMISSION_ORDER = "source"  # Start files in "source" order, "smallest" or "largest" first
+    SPOOL_BUDGET = 0          # Max bytes of admitted files on disk at once (0 = free space only)
+    MIN_FREE_SPACE = 512 * 1024 * 1024  # Disk space always kept free in DOWNLOAD_DIR
+    HELPER_BOT_TOKENS = []    # Extra bots (admins in source and destinations) sharing transfers
+    HELPER_SESSION_STRINGS = []  # Extra user sessions sharing transfers
+    PARALLEL_DOWNLOAD_THRESHOLD = 100 * 1024 * 1024  # Files this big download as parallel ranges
+    PARALLEL_DOWNLOAD_CONNECTIONS = 4  # Connections (byte ranges) per large download
+    MAX_TRANSMISSIONS = 12    # Concurrent file connections per session (pyrogram default is 1)
+    
+    # ============ RETRIES ============
+    RETRY_ATTEMPTS = 3        # Retries per file after network errors and FloodWait
+    RETRY_BASE_DELAY = 2      # Seconds before the first retry, doubled for every next one
+    RETRY_MAX_DELAY = 60      # Longest backoff between two retries
+    
+    # ============ STREAMING RELAY ============
+    STREAM_MODE = False                       # Relay download chunks straight into the upload
+    STREAM_BUFFER_SIZE = 64 * 1024 * 1024     # In-memory relay buffer per file
+    STREAM_SPILL_LIMIT = 512 * 1024 * 1024    # Max bytes spilled to DOWNLOAD_DIR per file
+    
+    # ============ STATUS MESSAGES ============
+    STATUS_UPDATE_INTERVAL = 3    # Minimum seconds between edits of one status message
+    STATUS_MAX_INTERVAL = 30      # Longest interval after repeated FloodWaits
+    STATUS_EDITS_PER_MINUTE = 20  # Status edits per minute shared by all jobs
+    
+    # ============ RATE LIMITS ============
+    API_RATE_LIMITS = {           # Raw method -> (calls per second, burst)
+        "default": (25, 30),
+        "GetMessages": (10, 20),
+        "SendMedia": (10, 10),
+        "SendMessage": (10, 10),
+        "EditMessage": (5, 10),
+    }
+    CHAT_RATE_LIMIT = (1, 3)      # Messages per second and burst in one private chat
+    GROUP_RATE_LIMIT = (20 / 60, 20)  # Messages per second and burst in one group/channel
+    FLOOD_RETRIES = 3             # Retries of one call after waiting out FloodWait
+    MAX_FLOOD_WAIT = 300          # Longer waits are raised to the caller instead
+    
+    # ============ METRICS ============
+    METRICS_PORT = 0              # Serve Prometheus metrics on this port (0 = off)
+    METRICS_HOST = "127.0.0.1"    # Interface for the metrics endpoint
+    METRICS_LAG_INTERVAL = 0.5    # Seconds between event loop lag probes
+    
     @classmethod
     def is_configured(cls):
         return all([cls.API_ID, cls.API_HASH, cls.BOT_TOKEN, cls.OWNER_ID])
@@ -0,0 +1,87 @@
+"""
+Job and file controls - cancel, pause and resume from the status buttons
+Stopping a file cancels the task of its current transfer, so the download or
+upload ends at once and the worker releases its session, disk reservation
+and in-flight slot. Paused files keep their place (and large downloads their
+partial file) and go back to the front of the queue when resumed, nothing is
+scanned again.
+"""
+from bot.queue import QueueItem
+from bot.status import publish
+
+# Why a file's transfer was stopped (QueueItem.halt)
+CANCEL = "cancel"    # Skip the file
+HOLD = "hold"        # File paused, waits in state['held'] until resumed
+REQUEUE = "requeue"  # Job paused, back to the front of the queue
+
+def wake(state: dict):
+    state['wake'].set()
+    publish(state)
+
+def stop_transfer(state: dict, queue_item: QueueItem, halt: str):
+    queue_item.halt = halt
+    task = state['transfers'].get(queue_item.msg_id)
+    if task:
+        task.cancel()
+
+def find_waiting(items: list, msg_id: int) -> QueueItem | None:
+    return next((item for item in items if item.msg_id == msg_id), None)
+
+def cancel_job(state: dict):
+    state['cancel_all'] = True
+    for task in state['transfers'].values():
+        task.cancel()
+    wake(state)
+
+def pause_job(state: dict):
+    state['paused'] = True
+    for queue_item in state['in_flight'].values():
+        if not queue_item.halt:
+            stop_transfer(state, queue_item, REQUEUE)
+    wake(state)
+
+def resume_job(state: dict):
+    state['paused'] = False
+    wake(state)
+
+def cancel_file(state: dict, msg_id: int) -> bool:
+    queue_item = state['in_flight'].get(msg_id)
+    if queue_item:
+        stop_transfer(state, queue_item, CANCEL)
+        return True
+    
+    for items in (state['queue'], state['held']):
+        queue_item = find_waiting(items, msg_id)
+        if queue_item:
+            # The feeder accounts it as skipped
+            items.remove(queue_item)
+            queue_item.halt = CANCEL
+            state['cancelled'].append(queue_item)
+            wake(state)
+            return True
+    return False
+
+def pause_file(state: dict, msg_id: int) -> bool:
+    queue_item = state['in_flight'].get(msg_id)
+    if queue_item:
+        stop_transfer(state, queue_item, HOLD)
+        return True
+    
+    queue_item = find_waiting(state['queue'], msg_id)
+    if queue_item:
+        state['queue'].remove(queue_item)
+        state['held'].append(queue_item)
+        wake(state)
+        return True
+    return False
+
+def resume_file(state: dict, msg_id: int) -> bool:
+    queue_item = find_waiting(state['held'], msg_id)
+    if not queue_item:
+        return False
+    state['held'].remove(queue_item)
+    state['queue'].insert(0, queue_item)
+    wake(state)
+    return True
+
+FILE_ACTIONS = {"cancel": cancel_file, "pause": pause_file, "resume": resume_file}
@@ -1,16 +1,191 @@
 """
-Database - Not used in ultra simple version
-Kept for compatibility only
+Database - SQLite (WAL) settings store
+Reads come from an in-memory cache, writes are coalesced and flushed in batches
 """
+import os
+import json
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from bot.config import Config
+
+# Settings persisted across restarts - each maps to a Config attribute. Only
+# settings changed by bot commands (/setsource, /setdest, /split, /setthumb,
+# /watch) belong here, a stored value overrides bot/config.py on every start.
+PERSISTED_SETTINGS = [
+    "SOURCE_CHANNEL_IDS",
+    "DESTINATION_CHANNEL_IDS",
+    "SPLIT_LARGE_FILES",
+    "THUMBNAIL_RULES",
+    "WATCH_MODE",
+]
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_channel INTEGER NOT NULL,
+        start_link TEXT NOT NULL,
+        end_link TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS job_items (
+        job_id INTEGER NOT NULL,
+        msg_id INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        delivered TEXT NOT NULL DEFAULT '[]',
+        error TEXT,
+        PRIMARY KEY (job_id, msg_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS delivered_files (
+        file_unique_id TEXT NOT NULL,
+        dest_channel INTEGER NOT NULL,
+        file_size INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        PRIMARY KEY (file_unique_id, dest_channel)
+    ) WITHOUT ROWID;
+    """,
+]
+
+_conn = None
+_cache = {}
+_dirty = {}
+_flush_task = None
+_flush_hooks = []
+
+# A single worker thread owns the connection, so every query is serialized
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+def get_connection() -> sqlite3.Connection:
+    """Open (once) the shared connection and bring the schema up to date"""
+    global _conn
+    
+    if _conn is None:
+        directory = os.path.dirname(Config.DATABASE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        _conn = sqlite3.connect(Config.DATABASE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        migrate(_conn)
+    
+    return _conn
+
+def migrate(conn: sqlite3.Connection):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for index, sql in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            conn.executescript(sql)
+            conn.execute(f"PRAGMA user_version={index}")
+
+async def run_db(func, *args):
+    """Run a blocking database function on the database thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
 
 def load_settings_sync():
-    return {}
+    """Load stored settings into the cache and Config, seeding the store on first run"""
+    conn = get_connection()
+    rows = conn.execute("SELECT key, value FROM settings").fetchall()
+    
+    _cache.clear()
+    for key, value in rows:
+        _cache[key] = json.loads(value)
+    
+    # Settings never stored before (first run, or added in a newer version)
+    # are seeded from the current Config defaults
+    missing = [key for key in PERSISTED_SETTINGS if key not in _cache]
+    if missing:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(getattr(Config, key))) for key in missing]
+            )
+        for key in missing:
+            _cache[key] = getattr(Config, key)
+    
+    for key in PERSISTED_SETTINGS:
+        setattr(Config, key, _cache[key])
+    
+    return dict(_cache)
+
+def _write_settings(items):
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            items
+        )
+
+async def flush_settings():
+    """Write all pending setting changes in one transaction"""
+    if not _dirty:
+        return
+    
+    pending = dict(_dirty)
+    _dirty.clear()
+    try:
+        await run_db(_write_settings, [(key, json.dumps(value)) for key, value in pending.items()])
+    except Exception:
+        # Keep the changes for the next flush, unless a newer value replaced them
+        for key, value in pending.items():
+            _dirty.setdefault(key, value)
+        raise
+
+def register_flush(func):
+    """Add an async flush function to run with every batched settings flush"""
+    _flush_hooks.append(func)
+    return func
+
+async def flush_all():
+    for func in [flush_settings] + _flush_hooks:
+        try:
+            await func()
+        except Exception as e:
+            print(f"Error flushing {func.__name__}: {e}")
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(Config.DB_FLUSH_INTERVAL)
+        await flush_all()
+
+def start_flusher():
+    """Start the background task that flushes coalesced writes"""
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop())
+
+async def stop_flusher():
+    global _flush_task
+    if _flush_task:
+        _flush_task.cancel()
+        _flush_task = None
+    await flush_all()
 
 async def save_settings(settings):
-    pass
+    for key, value in settings.items():
+        await update_setting(key, value)
 
 async def get_setting(key, default=None):
-    return default
+    return _cache.get(key, default)
 
 async def update_setting(key, value):
-    pass
+    """Update the cache (and Config) now, persist on the next flush"""
+    _cache[key] = value
+    _dirty[key] = value
+    if key in PERSISTED_SETTINGS:
+        setattr(Config, key, value)
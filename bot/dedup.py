@@ -0,0 +1,70 @@
+"""
+Duplicate index - file_unique_id of everything delivered to each destination
+Lives in the SQLite store, so lookups never need the whole index in memory
+"""
+from bot.database import get_connection, run_db, register_flush
+
+# SQLite's default limit on bound parameters per statement is 999
+LOOKUP_BATCH = 900
+
+# (file_unique_id, dest_channel) -> (file_size, name) waiting to be written
+_pending = {}
+
+def _find_delivered(unique_ids):
+    conn = get_connection()
+    found = {}
+    for start in range(0, len(unique_ids), LOOKUP_BATCH):
+        batch = unique_ids[start:start + LOOKUP_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        for unique_id, dest_channel in conn.execute(
+            f"SELECT file_unique_id, dest_channel FROM delivered_files WHERE file_unique_id IN ({placeholders})",
+            batch
+        ):
+            found.setdefault(unique_id, set()).add(dest_channel)
+    return found
+
+async def find_delivered(unique_ids) -> dict:
+    """file_unique_id -> destinations it was already delivered to"""
+    wanted = {uid for uid in unique_ids if uid}
+    # Deliveries not flushed yet count too. Taken before the read, since a
+    # flush meanwhile empties _pending and its write is only queued ahead of
+    # this read on the database thread if it started first.
+    pending = [key for key in _pending if key[0] in wanted]
+    found = await run_db(_find_delivered, list(wanted)) if wanted else {}
+    
+    for unique_id, dest_channel in pending:
+        found.setdefault(unique_id, set()).add(dest_channel)
+    return found
+
+def record(unique_id: str, dest_channel: int, file_size: int, name: str):
+    """Buffer a delivery, written with the next batched flush"""
+    if unique_id:
+        _pending[(unique_id, dest_channel)] = (file_size, name)
+
+def _write(rows):
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO delivered_files (file_unique_id, dest_channel, file_size, name) "
+            "VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+@register_flush
+async def flush_dedup():
+    if not _pending:
+        return
+    
+    pending = dict(_pending)
+    _pending.clear()
+    rows = [
+        (unique_id, dest_channel, file_size, name)
+        for (unique_id, dest_channel), (file_size, name) in pending.items()
+    ]
+    try:
+        await run_db(_write, rows)
+    except Exception:
+        # Keep the deliveries for the next flush
+        for key, delivery in pending.items():
+            _pending.setdefault(key, delivery)
+        raise
@@ -0,0 +1,123 @@
+"""
+Parallel downloader - large files fetched as concurrent byte ranges
+Each range streams over its own connection to the file's DC and is written at
+its offset in a preallocated file
+"""
+import os
+import math
+import asyncio
+import inspect
+from pyrogram.client import Client
+from pyrogram.types import Message
+from bot.config import Config
+
+# stream_media offsets and limits count 1 MiB chunks
+CHUNK_SIZE = 1024 * 1024
+RANGE_RETRIES = 3
+
+class IncompleteDownload(IOError):
+    """Media ended short - pyrogram logs and swallows get_file errors
+    (an expired file reference too) and just stops the stream"""
+
+def split_ranges(file_size: int, connections: int) -> list[tuple[int, int]]:
+    """(first chunk, chunk count) per connection, contiguous and chunk aligned"""
+    total_chunks = max(1, math.ceil(file_size / CHUNK_SIZE))
+    per_range = math.ceil(total_chunks / max(1, connections))
+    return [
+        (start, min(per_range, total_chunks - start))
+        for start in range(0, total_chunks, per_range)
+    ]
+
+async def download_parallel(client: Client, message: Message | str, file_name: str, file_size: int,
+                            progress=None, connections: int = None, resume: dict = None) -> str:
+    """Download message media (or a file_id) to file_name over several connections
+    
+    progress follows pyrogram's contract: progress(current, total), plain
+    function or coroutine function.
+    
+    resume maps each range's first chunk to [next chunk, end chunk] and is
+    kept up to date as chunks are written. With it a failed download keeps
+    its .part file, and a call with the same dict continues every range from
+    its last written chunk instead of from zero.
+    """
+    connections = connections or Config.PARALLEL_DOWNLOAD_CONNECTIONS
+    directory = os.path.dirname(file_name)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    temp_name = file_name + ".part"
+    ranges = resume if resume is not None else {}
+    if not ranges or not os.path.exists(temp_name):
+        ranges.clear()
+        ranges.update({first: [first, first + count] for first, count in split_ranges(file_size, connections)})
+        with open(temp_name, "wb") as f:
+            f.truncate(file_size)
+    
+    loop = asyncio.get_running_loop()
+    fd = os.open(temp_name, os.O_WRONLY)
+    downloaded = sum(
+        max(0, min(next_chunk * CHUNK_SIZE, file_size) - first * CHUNK_SIZE)
+        for first, (next_chunk, _) in ranges.items()
+    )
+    if downloaded:
+        print(f"Resuming {os.path.basename(file_name)} at {downloaded}/{file_size} bytes")
+    
+    async def report():
+        if progress:
+            result = progress(downloaded, file_size)
+            if inspect.isawaitable(result):
+                await result
+    
+    async def fetch(first_chunk: int):
+        nonlocal downloaded
+        span = ranges[first_chunk]
+        end_chunk = span[1]
+        attempt = 0
+        
+        while span[0] < end_chunk:
+            position = span[0] * CHUNK_SIZE
+            try:
+                async for chunk in client.stream_media(message, limit=end_chunk - span[0], offset=span[0]):
+                    await loop.run_in_executor(None, os.pwrite, fd, chunk, position)
+                    position += len(chunk)
+                    span[0] += 1
+                    downloaded += len(chunk)
+                    await report()
+                    if len(chunk) < CHUNK_SIZE:
+                        # Last chunk of the file
+                        span[0] = end_chunk
+                        return
+                if span[0] < end_chunk:
+                    raise IncompleteDownload(f"stream ended early at chunk {span[0]}")
+            except (OSError, asyncio.TimeoutError, ConnectionError) as e:
+                # Resume the range from the first chunk not written yet
+                attempt += 1
+                if attempt > RANGE_RETRIES:
+                    raise
+                print(f"Range {first_chunk}-{end_chunk} failed at chunk {span[0]} ({e}), retrying")
+                await asyncio.sleep(attempt)
+    
+    tasks = [asyncio.create_task(fetch(first)) for first in ranges]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        os.close(fd)
+        fd = None
+        if resume is None:
+            os.remove(temp_name)
+        raise
+    finally:
+        if fd is not None:
+            os.close(fd)
+    
+    actual_size = os.path.getsize(temp_name)
+    ranges.clear()
+    if downloaded != file_size or actual_size != file_size:
+        os.remove(temp_name)
+        raise IncompleteDownload(f"Size mismatch: got {downloaded} bytes ({actual_size} on disk), expected {file_size}")
+    
+    os.replace(temp_name, file_name)
+    return file_name
@@ -1,5 +1,10 @@
+import re
 from bot.config import Config
 
+USERNAME_PATTERN = re.compile(r'@\w+')
+TAMILMV_PATTERN = re.compile(r'www\.1tamilmv\.\S+\s*')
+SPACES_PATTERN = re.compile(r'\s+')
+
 def get_file_name(message):
     if message.document:
         return message.document.file_name or ""
@@ -13,72 +18,163 @@ def get_file_name(message):
         return message.caption
     return ""
 
-def should_process_file(file_name: str) -> tuple[bool, str]:
-    if not file_name:
-        return False, "No file name found"
-    
-    name_lower = file_name.lower()
-    
-    if Config.BLACKLIST_WORDS:
-        for word in Config.BLACKLIST_WORDS:
-            if word in name_lower:
-                return False, f"Blacklisted word: {word}"
-    
-    if Config.WHITELIST_WORDS:
-        found = False
-        for word in Config.WHITELIST_WORDS:
-            if word in name_lower:
-                found = True
-                break
-        if not found:
-            return False, "No whitelist word found"
-    
-    return True, "OK"
+def get_file_id(message) -> str | None:
+    media = message.document or message.video or message.audio or message.photo
+    return media.file_id if media else None
 
-def rename_file(original_name: str) -> str:
-    import re
+def get_file_unique_id(message) -> str | None:
+    media = message.document or message.video or message.audio or message.photo
+    return media.file_unique_id if media else None
+
+def compile_word_list(words) -> re.Pattern | None:
+    """Compile a word list into one trie-shaped regex
     
-    if not original_name:
-        return original_name
+    Words sharing a prefix share a branch, so a name is scanned once no matter
+    how many words are in the list, and the longest word wins at a position.
+    """
+    trie = {}
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
     
-    name_parts = original_name.rsplit('.', 1)
+    if not trie:
+        return None
     
-    if len(name_parts) == 2:
-        base_name, extension = name_parts
-    else:
-        base_name = original_name
-        extension = None
+    def build(node) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
     
-    # Step 1: Remove ALL underscores first (replace with space to preserve word boundaries)
-    base_name = base_name.replace('_', ' ')
+    return re.compile(build(trie))
+
+class RuleSet:
+    """Immutable, precompiled snapshot of the rename/filter settings"""
     
-    # Step 2: Remove @username patterns from ANYWHERE in filename if enabled
-    if Config.REMOVE_USERNAME:
-        base_name = re.sub(r'@\w+', '', base_name)  # Fixed: \S+ was too greedy
+    __slots__ = ('key', 'blacklist', 'whitelist', 'removed', 'remove_username', 'prefix', 'suffix')
     
-    # Step 3: Remove www.1tamilmv.* patterns (where * is dynamic)
-    base_name = re.sub(r'www\.1tamilmv\.\S+\s*', '', base_name)
+    def __init__(self, blacklist_words, whitelist_words, removed_words, remove_username, prefix, suffix):
+        object.__setattr__(self, 'key', rules_key(
+            blacklist_words, whitelist_words, removed_words, remove_username, prefix, suffix
+        ))
+        object.__setattr__(self, 'blacklist', compile_word_list(blacklist_words))
+        object.__setattr__(self, 'whitelist', compile_word_list(whitelist_words))
+        object.__setattr__(self, 'removed', compile_word_list(removed_words))
+        object.__setattr__(self, 'remove_username', bool(remove_username))
+        object.__setattr__(self, 'prefix', prefix or "")
+        object.__setattr__(self, 'suffix', suffix or "")
     
-    # Step 4: Remove specified words (case-sensitive exact match)
-    if Config.REMOVED_WORDS:
-        for word in Config.REMOVED_WORDS:
-            base_name = base_name.replace(word, '')
+    def __setattr__(self, name, value):
+        raise AttributeError("RuleSet is immutable")
     
-    # Step 5: Clean up extra spaces (multiple spaces to single space)
-    base_name = re.sub(r'\s+', ' ', base_name)
-    base_name = base_name.strip()
+    def check(self, file_name: str) -> tuple[bool, str]:
+        if not file_name:
+            return False, "No file name found"
+        
+        name_lower = file_name.lower()
+        
+        if self.blacklist:
+            match = self.blacklist.search(name_lower)
+            if match:
+                return False, f"Blacklisted word: {match.group()}"
+        
+        if self.whitelist and not self.whitelist.search(name_lower):
+            return False, "No whitelist word found"
+        
+        return True, "OK"
     
-    # Step 6: Add prefix and suffix
-    if base_name:  # Only add prefix/suffix if there's actual content left
-        new_name = f"{Config.FILE_PREFIX}{base_name}{Config.FILE_SUFFIX}"
-    else:
-        new_name = original_name  # Fallback to original if everything was removed
+    def rename(self, original_name: str) -> str:
+        if not original_name:
+            return original_name
+        
+        name_parts = original_name.rsplit('.', 1)
+        
+        if len(name_parts) == 2:
+            base_name, extension = name_parts
+        else:
+            base_name = original_name
+            extension = None
+        
+        # Step 1: Remove ALL underscores first (replace with space to preserve word boundaries)
+        base_name = base_name.replace('_', ' ')
+        
+        # Step 2: Remove @username patterns from ANYWHERE in filename if enabled
+        if self.remove_username:
+            base_name = USERNAME_PATTERN.sub('', base_name)
+        
+        # Step 3: Remove www.1tamilmv.* patterns (where * is dynamic)
+        base_name = TAMILMV_PATTERN.sub('', base_name)
+        
+        # Step 4: Remove specified words (case-sensitive exact match, single pass)
+        if self.removed:
+            base_name = self.removed.sub('', base_name)
+        
+        # Step 5: Clean up extra spaces (multiple spaces to single space)
+        base_name = SPACES_PATTERN.sub(' ', base_name)
+        base_name = base_name.strip()
+        
+        # Step 6: Add prefix and suffix
+        if base_name:  # Only add prefix/suffix if there's actual content left
+            new_name = f"{self.prefix}{base_name}{self.suffix}"
+        else:
+            new_name = original_name  # Fallback to original if everything was removed
+        
+        # Step 7: Add extension back if it existed
+        if extension:
+            new_name = f"{new_name}.{extension}"
+        
+        return new_name
     
-    # Step 7: Add extension back if it existed
-    if extension:
-        new_name = f"{new_name}.{extension}"
+    def classify(self, file_names) -> list[tuple[str, bool, str]]:
+        """Rename and filter a whole queue: [(new_name, should_process, reason)]"""
+        check = self.check
+        rename = self.rename
+        results = []
+        for file_name in file_names:
+            should_process, reason = check(file_name)
+            results.append((rename(file_name), should_process, reason))
+        return results
+
+def rules_key(blacklist_words, whitelist_words, removed_words, remove_username, prefix, suffix) -> tuple:
+    return (
+        tuple(blacklist_words or ()),
+        tuple(whitelist_words or ()),
+        tuple(removed_words or ()),
+        bool(remove_username),
+        prefix or "",
+        suffix or "",
+    )
+
+_rules = None
+
+def get_rules() -> RuleSet:
+    """Current RuleSet, recompiled only when the Config values change"""
+    global _rules
     
-    return new_name
+    key = rules_key(
+        Config.BLACKLIST_WORDS, Config.WHITELIST_WORDS, Config.REMOVED_WORDS,
+        Config.REMOVE_USERNAME, Config.FILE_PREFIX, Config.FILE_SUFFIX
+    )
+    if _rules is None or _rules.key != key:
+        _rules = RuleSet(*key)
+    return _rules
+
+def should_process_file(file_name: str) -> tuple[bool, str]:
+    return get_rules().check(file_name)
+
+def rename_file(original_name: str) -> str:
+    return get_rules().rename(original_name)
+
+def classify_files(file_names) -> list[tuple[str, bool, str]]:
+    return get_rules().classify(file_names)
 
 def has_downloadable_media(message) -> bool:
     return any([
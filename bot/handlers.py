@@ -2,18 +2,74 @@
 AutoRenamer Bot - Simple Handlers
 Ultra minimal bot for Koyeb
 """
+import time
 from pyrogram import filters
-from pyrogram.types import Message
+from pyrogram.types import Message, CallbackQuery
 from bot.config import Config
+from bot.database import update_setting
+from bot.jobs import manager
+from bot.ratelimit import limiter
+from bot.sessions import pool
+from bot.watcher import watcher
+from bot.thumbnail import save_thumbnail, delete_thumbnail, list_thumbnails, DEFAULT_THUMBNAIL
+from bot import control, journal, metrics
 
 def is_owner(_, __, message: Message):
     return message.from_user and message.from_user.id == Config.OWNER_ID
 
 owner_filter = filters.create(is_owner)
 
+def format_job(job: dict) -> str:
+    counts = job.get('counts', {})
+    done = counts.get(journal.UPLOADED, 0) + counts.get(journal.SKIPPED, 0)
+    total = sum(counts.values())
+    text = f"#{job['id']}: {job['start_link']} → {job['end_link']}\n"
+    text += f"   {done}/{total} done, {counts.get(journal.FAILED, 0)} failed"
+    if job.get('first_incomplete'):
+        text += f", resumes at {job['first_incomplete']}"
+    return text
+
+async def notify_unfinished_jobs(app):
+    """Tell the owner about jobs interrupted by the last restart"""
+    jobs = await journal.unfinished_jobs()
+    if not jobs:
+        return
+    
+    text = "♻️ **Unfinished jobs from before the restart:**\n\n"
+    text += "\n".join(format_job(job) for job in jobs)
+    text += "\n\nUse /resume <job_id> to continue"
+    print(f"♻️ {len(jobs)} unfinished job(s) can be resumed")
+    try:
+        await app.send_message(Config.OWNER_ID, text)
+    except Exception as e:
+        print(f"Could not notify owner: {e}")
+
+def format_live_job(job) -> str:
+    state = job.state
+    if state['status'] == 'queued':
+        return f"⏳ #{job.id} (priority {job.priority}): {job.start_link} → {job.end_link}"
+    return (
+        f"⚙️ #{job.id}: {job.start_link} → {job.end_link}\n"
+        f"   {state['status']}, {state['processed']}/{state['to_process']} processed"
+    )
+
+def thumbnail_target(args: list) -> tuple:
+    """(thumbnail name, rule key) from [dest|source <channel_id>], raises ValueError"""
+    if not args:
+        return DEFAULT_THUMBNAIL, None
+    kind, channel_id = args[0].lower(), int(args[1])
+    if kind not in ("dest", "source"):
+        raise ValueError(kind)
+    return f"{kind}_{channel_id}", f"{kind}:{channel_id}"
+
 def register_handlers(app):
     """Register all bot command handlers"""
     
+    @app.on_message(filters.regex(r"^/(\w+)") & owner_filter, group=-1)
+    async def count_command(client, message: Message):
+        # Runs ahead of the command handlers (group -1) and lets them handle it
+        metrics.commands_total.inc(command=message.matches[0].group(1).lower())
+    
     @app.on_message(filters.command("start") & owner_filter)
     async def start(client, message: Message):
         await message.reply_text(
@@ -33,7 +89,19 @@ def register_handlers(app):
             "/setsource <channel_id> - Set download source\n"
             "/setdest <channel_id> - Set upload destination\n"
             "/status - Show current configuration\n"
-            "/process - Start processing (when configured)\n\n"
+            "/process <start_link> <end_link> - Process a message range\n"
+            "/jobs - List running, queued and unfinished jobs\n"
+            "/resume <job_id> - Resume an unfinished job\n"
+            "/retry [job_id] - List jobs with failed files, or re-run one's failed files\n"
+            "/prio <job_id> <priority> - Reorder a queued job (higher first)\n"
+            "/cancel <job_id> - Cancel a running or queued job\n"
+            "/limits - Show API rate limiting counters\n"
+            "/sessions - Show transfer sessions and their load\n"
+            "/setthumb [dest|source <channel_id>] - Reply to a photo to set a thumbnail\n"
+            "/delthumb [dest|source <channel_id>] - Remove a thumbnail\n"
+            "/thumbs - List thumbnails and their rules\n"
+            "/watch [on|off] - Process new source channel posts automatically\n"
+            "/split [on|off] - Post files too big to upload as volumes\n\n"
             "**Channel ID Format:**\n"
             "-100XXXXXXXXXX (for channels)\n"
             "@username (for public channels)"
@@ -58,7 +126,7 @@ def register_handlers(app):
         
         try:
             channel_id = int(message.command[1])
-            Config.SOURCE_CHANNEL_IDS = [channel_id]
+            await update_setting("SOURCE_CHANNEL_IDS", [channel_id])
             await message.reply_text(f"✅ Source channel set to: {channel_id}")
         except ValueError:
             await message.reply_text("❌ Invalid channel ID")
@@ -71,18 +139,265 @@ def register_handlers(app):
         
         try:
             channel_id = int(message.command[1])
-            Config.DESTINATION_CHANNEL_IDS = [channel_id]
+            await update_setting("DESTINATION_CHANNEL_IDS", [channel_id])
             await message.reply_text(f"✅ Destination channel set to: {channel_id}")
         except ValueError:
             await message.reply_text("❌ Invalid channel ID")
     
     @app.on_message(filters.command("process") & owner_filter)
     async def process_cmd(client, message: Message):
-        if not Config.SOURCE_CHANNEL_IDS or not Config.DESTINATION_CHANNEL_IDS:
-            await message.reply_text("❌ Please set source and destination channels first")
+        if not Config.DESTINATION_CHANNEL_IDS:
+            await message.reply_text("❌ Please set a destination channel first")
+            return
+        
+        if len(message.command) < 3:
+            await message.reply_text("Usage: /process <start_link> <end_link>")
+            return
+        
+        status_message = await message.reply_text("⏳ Starting...")
+        try:
+            await manager.submit(client, message.command[1], message.command[2], status_message)
+        except (ValueError, IndexError):
+            await status_message.edit_text("❌ Invalid message link")
+    
+    @app.on_message(filters.command("jobs") & owner_filter)
+    async def jobs_cmd(client, message: Message):
+        live = manager.list_jobs()
+        live_ids = {job.id for job in live}
+        interrupted = [job for job in await journal.unfinished_jobs() if job['id'] not in live_ids]
+        
+        if not live and not interrupted:
+            await message.reply_text("✅ No jobs")
+            return
+        
+        text = ""
+        if live:
+            text += "🗂 **Jobs:**\n\n" + "\n".join(format_live_job(job) for job in live) + "\n\n"
+        if interrupted:
+            text += "♻️ **Unfinished (use /resume):**\n\n" + "\n".join(format_job(job) for job in interrupted)
+        await message.reply_text(text.strip())
+    
+    @app.on_message(filters.command("resume") & owner_filter)
+    async def resume_cmd(client, message: Message):
+        if len(message.command) < 2:
+            await message.reply_text("Usage: /resume <job_id>")
+            return
+        
+        try:
+            job = await journal.get_job(int(message.command[1]))
+        except ValueError:
+            job = None
+        
+        if not job or job['status'] != 'running':
+            await message.reply_text("❌ No unfinished job with that ID")
+            return
+        
+        if manager.get(job['id']):
+            await message.reply_text(f"❌ Job #{job['id']} is already running or queued")
+            return
+        
+        status_message = await message.reply_text(f"♻️ Resuming job #{job['id']}...")
+        await manager.submit(client, job['start_link'], job['end_link'], status_message, job_id=job['id'])
+    
+    @app.on_message(filters.command("retry") & owner_filter)
+    async def retry_cmd(client, message: Message):
+        failed = {job['id']: job for job in await journal.failed_jobs()}
+        
+        if len(message.command) < 2:
+            if not failed:
+                await message.reply_text("✅ No failed files to retry")
+                return
+            text = "🔁 **Failed files:**\n\n"
+            for job in failed.values():
+                text += format_job(job) + "\n"
+                for error, count in job['errors']:
+                    text += f"   {count}x {error or 'unknown error'}\n"
+            text += "\nUse /retry <job_id> to re-run a job's failed files"
+            await message.reply_text(text)
+            return
+        
+        try:
+            job = failed.get(int(message.command[1]))
+        except ValueError:
+            job = None
+        
+        if not job:
+            await message.reply_text("❌ No ended job with failed files has that ID")
+            return
+        
+        if manager.get(job['id']):
+            await message.reply_text(f"❌ Job #{job['id']} is already running or queued")
+            return
+        
+        await journal.reopen_job(job['id'])
+        status_message = await message.reply_text(f"🔁 Retrying {job['counts'].get(journal.FAILED, 0)} failed file(s) of job #{job['id']}...")
+        await manager.submit(client, job['start_link'], job['end_link'], status_message, job_id=job['id'])
+    
+    @app.on_message(filters.command("prio") & owner_filter)
+    async def prio_cmd(client, message: Message):
+        try:
+            job_id, priority = int(message.command[1]), int(message.command[2])
+        except (ValueError, IndexError):
+            await message.reply_text("Usage: /prio <job_id> <priority>")
+            return
+        
+        if manager.set_priority(job_id, priority):
+            await message.reply_text(f"✅ Job #{job_id} priority set to {priority}")
+        else:
+            await message.reply_text("❌ No running or queued job with that ID")
+    
+    @app.on_message(filters.command("cancel") & owner_filter)
+    async def cancel_cmd(client, message: Message):
+        try:
+            job_id = int(message.command[1])
+        except (ValueError, IndexError):
+            await message.reply_text("Usage: /cancel <job_id>")
             return
         
+        if await manager.cancel(job_id):
+            await message.reply_text(f"🛑 Cancelling job #{job_id}")
+        else:
+            await message.reply_text("❌ No running or queued job with that ID")
+    
+    @app.on_callback_query(filters.regex(r"^ctl:") & owner_filter)
+    async def control_button(client, query: CallbackQuery):
+        # ctl:<job_id>:<action>[:<msg_id>] from the status message buttons
+        parts = query.data.split(":")
+        job = manager.get(int(parts[1]))
+        if not job:
+            await query.answer("Job already finished")
+            return
+        
+        action = parts[2]
+        if len(parts) == 4:
+            msg_id = int(parts[3])
+            if control.FILE_ACTIONS[action](job.state, msg_id):
+                await query.answer(f"{action.capitalize()} file {msg_id}")
+            else:
+                await query.answer("File is no longer waiting or in flight")
+        elif action == "cancel":
+            await manager.cancel(job.id)
+            await query.answer(f"Cancelling job #{job.id}")
+        elif action == "pause":
+            control.pause_job(job.state)
+            await query.answer(f"Job #{job.id} paused")
+        elif action == "resume":
+            control.resume_job(job.state)
+            await query.answer(f"Job #{job.id} resumed")
+    
+    @app.on_message(filters.command("limits") & owner_filter)
+    async def limits_cmd(client, message: Message):
+        snapshot = limiter.snapshot()
+        if not snapshot:
+            await message.reply_text("📉 No API calls made yet")
+            return
+        
+        text = f"📉 **Rate limiting** ({limiter.throttled_seconds():.1f}s spent waiting)\n\n"
+        for key, stats in sorted(snapshot.items(), key=lambda item: -item[1]['calls']):
+            text += f"`{key}`: {stats['calls']} calls"
+            if stats['throttled']:
+                text += f", throttled {stats['throttled']}x ({stats['throttled_seconds']:.1f}s)"
+            if stats['flood_waits']:
+                text += f", FloodWait {stats['flood_waits']}x ({stats['flood_seconds']:.0f}s)"
+            text += "\n"
+        await message.reply_text(text)
+    
+    @app.on_message(filters.command("sessions") & owner_filter)
+    async def sessions_cmd(client, message: Message):
+        text = "🔌 **Transfer sessions**\n\n"
+        for session in pool.members(client):
+            cooldown = session.cooldown_until - time.monotonic()
+            text += f"`{session.name}`: {session.active} active, {session.files} files"
+            if cooldown > 0:
+                text += f", cooling down {cooldown:.0f}s"
+            text += "\n"
+        if len(pool.members(client)) == 1:
+            text += "\nAdd HELPER_BOT_TOKENS or HELPER_SESSION_STRINGS in config to share transfers"
+        await message.reply_text(text)
+    
+    @app.on_message(filters.command("setthumb") & owner_filter)
+    async def set_thumb(client, message: Message):
+        photo_msg = message if message.photo else message.reply_to_message
+        if not photo_msg or not photo_msg.photo:
+            await message.reply_text("Usage: reply to a photo with /setthumb [dest|source <channel_id>]")
+            return
+        
+        try:
+            name, rule = thumbnail_target(message.command[1:])
+        except (ValueError, IndexError):
+            await message.reply_text("❌ Usage: /setthumb [dest|source <channel_id>]")
+            return
+        
+        photo = await client.download_media(photo_msg, in_memory=True)
+        if not await save_thumbnail(photo, name):
+            await message.reply_text("❌ Could not read that photo")
+            return
+        
+        if rule:
+            await update_setting("THUMBNAIL_RULES", {**Config.THUMBNAIL_RULES, rule: name})
+        await message.reply_text(f"🖼️ Thumbnail `{name}` saved")
+    
+    @app.on_message(filters.command("delthumb") & owner_filter)
+    async def del_thumb(client, message: Message):
+        try:
+            name, rule = thumbnail_target(message.command[1:])
+        except (ValueError, IndexError):
+            await message.reply_text("❌ Usage: /delthumb [dest|source <channel_id>]")
+            return
+        
+        if rule in Config.THUMBNAIL_RULES:
+            rules = dict(Config.THUMBNAIL_RULES)
+            del rules[rule]
+            await update_setting("THUMBNAIL_RULES", rules)
+        if await delete_thumbnail(name):
+            await message.reply_text(f"🗑️ Thumbnail `{name}` removed")
+        else:
+            await message.reply_text(f"❌ No thumbnail `{name}`")
+    
+    @app.on_message(filters.command("thumbs") & owner_filter)
+    async def thumbs_cmd(client, message: Message):
+        names = list_thumbnails()
+        if not names:
+            await message.reply_text("🖼️ No thumbnails set")
+            return
+        
+        text = "🖼️ **Thumbnails**\n\n"
+        text += "\n".join(f"`{name}`" for name in names)
+        if Config.THUMBNAIL_RULES:
+            text += "\n\n**Rules:**\n"
+            text += "\n".join(f"`{rule}` → `{name}`" for rule, name in Config.THUMBNAIL_RULES.items())
+        await message.reply_text(text)
+    
+    @app.on_message(filters.command("watch") & owner_filter)
+    async def watch_cmd(client, message: Message):
+        if len(message.command) > 1:
+            mode = message.command[1].lower()
+            if mode not in ("on", "off"):
+                await message.reply_text("Usage: /watch [on|off]")
+                return
+            if mode == "on" and not Config.DESTINATION_CHANNEL_IDS:
+                await message.reply_text("❌ Please set a destination channel first")
+                return
+            # Start from the next post, not from where an old watch stopped
+            await watcher.reset()
+            await update_setting("WATCH_MODE", mode == "on")
+        
+        text = f"👀 **Watch mode: {'on' if Config.WATCH_MODE else 'off'}**\n\n"
+        text += f"Source channels: {', '.join(str(c) for c in Config.SOURCE_CHANNEL_IDS) or 'none'}\n"
+        for chat_id, batch in watcher.batches.items():
+            text += f"`{chat_id}`: {batch.posts} post(s) waiting ({batch.first_id}-{batch.last_id})\n"
+        await message.reply_text(text)
+    
+    @app.on_message(filters.command("split") & owner_filter)
+    async def split_cmd(client, message: Message):
+        if len(message.command) > 1:
+            mode = message.command[1].lower()
+            if mode not in ("on", "off"):
+                await message.reply_text("Usage: /split [on|off]")
+                return
+            await update_setting("SPLIT_LARGE_FILES", mode == "on")
+        
         await message.reply_text(
-            "✅ Processing started\n"
-            "Implementation pending - will download and upload files"
+            f"✂️ **Split large files: {'on' if Config.SPLIT_LARGE_FILES else 'off'}**\n\n"
+            f"Volume size: {Config.SPLIT_PART_SIZE // (1024 * 1024)} MiB"
         )
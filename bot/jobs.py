@@ -0,0 +1,166 @@
+"""
+Job manager - runs several process_range jobs at once
+Global concurrency limit, fair across source channels, pending jobs can be
+listed, reprioritized and cancelled individually
+"""
+import asyncio
+import itertools
+from collections import Counter
+from pyrogram.client import Client
+from pyrogram.types import Message
+from pyrogram.enums import ParseMode
+from bot.config import Config
+from bot.processor import process_range, new_job_state, parse_link
+from bot.status import get_status_text, edit_status, control_rows, control_keyboard
+from bot import control, journal, metrics
+
+_sequence = itertools.count()
+
+class Job:
+    """One range job and the state its status message renders from"""
+    
+    def __init__(self, job_id: int, source_channel: int, start_link: str, end_link: str,
+                 status_message: Message, priority: int = 0):
+        self.id = job_id
+        self.source_channel = source_channel
+        self.start_link = start_link
+        self.end_link = end_link
+        self.status_message = status_message
+        self.priority = priority
+        self.seq = next(_sequence)
+        self.state = new_job_state()
+        self.state['status'] = 'queued'
+        self.task = None
+    
+    def cancel(self):
+        control.cancel_job(self.state)
+
+class JobManager:
+    def __init__(self):
+        self.client = None
+        self.pending = []
+        self.running = {}
+    
+    async def submit(self, client: Client, start_link: str, end_link: str, status_message: Message,
+                     job_id: int = None, priority: int = 0) -> Job:
+        """Queue a job (a new one, or an unfinished journal job to resume)"""
+        self.client = client
+        source_channel, _ = parse_link(start_link)
+        parse_link(end_link)
+        
+        if job_id is None:
+            job_id = await journal.create_job(source_channel, start_link, end_link)
+        
+        job = Job(job_id, source_channel, start_link, end_link, status_message, priority)
+        self.pending.append(job)
+        self._schedule()
+        
+        if job in self.pending:
+            reply_markup = control_keyboard(control_rows(job.state, job.id))
+            await self._edit(job, get_status_text(job.state, job.id), reply_markup)
+        return job
+    
+    def _pick_next(self) -> Job:
+        # Sources with fewer running jobs go first, then priority, then FIFO
+        running_per_source = Counter(job.source_channel for job in self.running.values())
+        return min(self.pending, key=lambda job: (running_per_source[job.source_channel], -job.priority, job.seq))
+    
+    def _schedule(self):
+        while self.pending and len(self.running) < max(1, Config.MAX_CONCURRENT_JOBS):
+            job = self._pick_next()
+            self.pending.remove(job)
+            self.running[job.id] = job
+            job.task = asyncio.create_task(self._run(job))
+    
+    async def _run(self, job: Job):
+        try:
+            _, summary = await process_range(self.client, job)
+        except Exception as e:
+            summary = f"❌ Error: {str(e)[:100]}"
+        finally:
+            self.running.pop(job.id, None)
+            self._schedule()
+        
+        await self._edit(job, summary)
+    
+    async def _edit(self, job: Job, text: str, reply_markup=None):
+        if job.status_message is None:
+            # Watched batches run without a status message
+            if job.state['status'] != 'queued':
+                print(f"Job #{job.id}: {text}")
+            return
+        try:
+            await edit_status(job.status_message, text, reply_markup)
+        except Exception:
+            try:
+                await job.status_message.reply_text(text, parse_mode=ParseMode.HTML)
+            except Exception as e:
+                print(f"Could not update job #{job.id} status: {e}")
+    
+    def get(self, job_id: int) -> Job | None:
+        if job_id in self.running:
+            return self.running[job_id]
+        return next((job for job in self.pending if job.id == job_id), None)
+    
+    def list_jobs(self) -> list:
+        """Running jobs first, then pending jobs in the order they will start"""
+        running_per_source = Counter(job.source_channel for job in self.running.values())
+        pending = sorted(self.pending, key=lambda job: (running_per_source[job.source_channel], -job.priority, job.seq))
+        return list(self.running.values()) + pending
+    
+    def set_priority(self, job_id: int, priority: int) -> bool:
+        job = self.get(job_id)
+        if not job:
+            return False
+        job.priority = priority
+        return True
+    
+    async def cancel(self, job_id: int) -> bool:
+        job = self.get(job_id)
+        if not job:
+            return False
+        
+        job.cancel()
+        if job in self.pending:
+            self.pending.remove(job)
+            await journal.finish_job(job.id, 'cancelled')
+            await self._edit(job, f"❌ Job #{job.id} cancelled")
+        return True
+
+manager = JobManager()
+
+def queue_depth() -> dict:
+    """Files of running jobs waiting to start and in flight, read on scrape"""
+    waiting = active = 0
+    for job in manager.running.values():
+        waiting += sum(1 for item in job.state['queue'] if not item.skip_reason)
+        active += len(job.state['active'])
+    return {(('stage', 'waiting'),): waiting, (('stage', 'active'),): active}
+
+metrics.Gauge("queue_depth", "Files of running jobs by stage", collect=queue_depth)
+metrics.Gauge("jobs", "Range jobs by state", collect=lambda: {
+    (('state', 'running'),): len(manager.running),
+    (('state', 'queued'),): len(manager.pending),
+})
+
+def transfer_speed() -> dict:
+    """Smoothed speed of files in flight by phase, from their TransferStats"""
+    speeds = {}
+    for job in manager.running.values():
+        for transfer in job.state['active'].values():
+            key = (('phase', transfer.phase),)
+            speeds[key] = speeds.get(key, 0.0) + transfer.speed
+    return speeds
+
+def job_telemetry(field: str) -> dict:
+    """A JobStats value per running job, jobs without an ETA yet are left out"""
+    values = {}
+    for job in manager.running.values():
+        value = getattr(job.state['job_stats'], field)
+        if value is not None:
+            values[(('job', job.id),)] = value
+    return values
+
+metrics.Gauge("transfer_bytes_per_second", "Transfer speed of running jobs by phase", collect=transfer_speed)
+metrics.Gauge("job_bytes_per_second", "Transfer speed of each running job", collect=lambda: job_telemetry('speed'))
+metrics.Gauge("job_eta_seconds", "Estimated seconds left of each running job", collect=lambda: job_telemetry('eta'))
@@ -0,0 +1,191 @@
+"""
+Job journal - durable per-message progress for process_range
+Item updates are buffered in memory and written in batches with the settings flush
+"""
+import json
+import time
+from bot.database import get_connection, run_db, register_flush
+
+# Item states
+QUEUED = "queued"
+DOWNLOADED = "downloaded"
+UPLOADED = "uploaded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+DONE_STATES = (UPLOADED, SKIPPED)
+
+# (job_id, msg_id) -> [state, delivered, error] waiting to be written
+_pending = {}
+# (job_id, msg_id) -> delivered destinations, for items touched this run
+_delivered = {}
+
+def _create_job(source_channel, start_link, end_link):
+    conn = get_connection()
+    now = time.time()
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO jobs (source_channel, start_link, end_link, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'running', ?, ?)",
+            (source_channel, start_link, end_link, now, now)
+        )
+    return cursor.lastrowid
+
+async def create_job(source_channel: int, start_link: str, end_link: str) -> int:
+    return await run_db(_create_job, source_channel, start_link, end_link)
+
+def _set_job_status(job_id, status):
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id))
+
+async def finish_job(job_id: int, status: str = "done"):
+    await flush_journal()
+    await run_db(_set_job_status, job_id, status)
+
+def _get_job(job_id):
+    row = get_connection().execute(
+        "SELECT id, source_channel, start_link, end_link, status, created_at FROM jobs WHERE id = ?",
+        (job_id,)
+    ).fetchone()
+    return _job_dict(row) if row else None
+
+async def get_job(job_id: int) -> dict | None:
+    return await run_db(_get_job, job_id)
+
+def _job_dict(row):
+    return {
+        'id': row[0],
+        'source_channel': row[1],
+        'start_link': row[2],
+        'end_link': row[3],
+        'status': row[4],
+        'created_at': row[5],
+    }
+
+def _unfinished_jobs():
+    conn = get_connection()
+    jobs = []
+    for row in conn.execute(
+        "SELECT id, source_channel, start_link, end_link, status, created_at FROM jobs "
+        "WHERE status = 'running' ORDER BY id"
+    ):
+        job = _job_dict(row)
+        counts = dict(conn.execute(
+            "SELECT state, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY state", (job['id'],)
+        ).fetchall())
+        job['counts'] = counts
+        job['first_incomplete'] = conn.execute(
+            "SELECT MIN(msg_id) FROM job_items WHERE job_id = ? AND state NOT IN (?, ?)",
+            (job['id'], *DONE_STATES)
+        ).fetchone()[0]
+        jobs.append(job)
+    return jobs
+
+async def unfinished_jobs() -> list:
+    """Jobs still marked running - interrupted by a crash or redeploy"""
+    await flush_journal()
+    return await run_db(_unfinished_jobs)
+
+def _failed_jobs():
+    conn = get_connection()
+    jobs = []
+    for row in conn.execute(
+        "SELECT id, source_channel, start_link, end_link, status, created_at FROM jobs "
+        "WHERE status != 'running' AND id IN (SELECT job_id FROM job_items WHERE state = ?) ORDER BY id",
+        (FAILED,)
+    ):
+        job = _job_dict(row)
+        job['counts'] = dict(conn.execute(
+            "SELECT state, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY state", (job['id'],)
+        ).fetchall())
+        job['errors'] = conn.execute(
+            "SELECT error, COUNT(*) FROM job_items WHERE job_id = ? AND state = ? "
+            "GROUP BY error ORDER BY COUNT(*) DESC LIMIT 3",
+            (job['id'], FAILED)
+        ).fetchall()
+        jobs.append(job)
+    return jobs
+
+async def failed_jobs() -> list:
+    """Ended jobs that still have failed items - what /retry can re-run"""
+    await flush_journal()
+    return await run_db(_failed_jobs)
+
+async def reopen_job(job_id: int):
+    """Mark an ended job running again, resuming it re-runs its failed items"""
+    await run_db(_set_job_status, job_id, "running")
+
+def _load_items(job_id):
+    items = {}
+    for msg_id, state, delivered in get_connection().execute(
+        "SELECT msg_id, state, delivered FROM job_items WHERE job_id = ?", (job_id,)
+    ):
+        items[msg_id] = (state, json.loads(delivered))
+    return items
+
+async def load_items(job_id: int) -> dict:
+    """msg_id -> (state, delivered destinations) for a job"""
+    await flush_journal()
+    return await run_db(_load_items, job_id)
+
+def record(job_id: int, msg_id: int, state: str, error: str = None):
+    """Buffer a state change for one item"""
+    if job_id is None:
+        return
+    key = (job_id, msg_id)
+    _pending[key] = [state, _delivered.get(key, []), error]
+
+def record_delivery(job_id: int, msg_id: int, dest_channel: int):
+    """Buffer a successful upload to one destination, the item stays
+    DOWNLOADED until record() marks it UPLOADED"""
+    if job_id is None:
+        return
+    key = (job_id, msg_id)
+    delivered = _delivered.setdefault(key, [])
+    if dest_channel not in delivered:
+        delivered.append(dest_channel)
+    _pending[key] = [DOWNLOADED, delivered, None]
+
+def set_delivered(job_id: int, msg_id: int, delivered: list):
+    """Seed already delivered destinations when resuming a job"""
+    _delivered[(job_id, msg_id)] = list(delivered)
+
+def _write_items(rows):
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO job_items (job_id, msg_id, state, delivered, error) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(job_id, msg_id) DO UPDATE SET "
+            "state = excluded.state, delivered = excluded.delivered, error = excluded.error",
+            rows
+        )
+        conn.executemany(
+            "UPDATE jobs SET updated_at = ? WHERE id = ?",
+            [(time.time(), job_id) for job_id in {row[0] for row in rows}]
+        )
+
+@register_flush
+async def flush_journal():
+    """Write buffered item updates in one transaction"""
+    if not _pending:
+        return
+    
+    pending = dict(_pending)
+    _pending.clear()
+    rows = [
+        (job_id, msg_id, state, json.dumps(delivered), error)
+        for (job_id, msg_id), (state, delivered, error) in pending.items()
+    ]
+    try:
+        await run_db(_write_items, rows)
+    except Exception:
+        # Keep the updates for the next flush, unless a newer one replaced them
+        for key, update in pending.items():
+            _pending.setdefault(key, update)
+        raise
+
+def forget_job(job_id: int):
+    """Drop in-memory delivery tracking once a job has ended"""
+    for key in [key for key in _delivered if key[0] == job_id]:
+        del _delivered[key]
@@ -0,0 +1,72 @@
+"""
+Language & subtitle detection for captions
+One compiled pattern, scanned once per name, results cached per file name
+"""
+import re
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+# language -> (short code, subtitle tag)
+LANGUAGES = {
+    'English': ('eng', 'esub'),
+    'Hindi': ('hin', 'hsub'),
+    'Telugu': ('tel', 'tesub'),
+    'Kannada': ('kan', 'ksub'),
+    'Tamil': ('tam', 'tsub'),
+    'Malayalam': ('mal', 'msub'),
+    'Punjabi': ('pan', 'psub'),
+}
+
+def _build_pattern() -> tuple[re.Pattern, dict]:
+    groups = {}
+    alternatives = []
+    # A full name starts a word or directly follows another one ("TamilHindi")
+    name_start = "(?:(?<![a-z])|" + "|".join(f"(?<={language.lower()})" for language in LANGUAGES) + ")"
+    for index, (language, (code, sub_tag)) in enumerate(LANGUAGES.items()):
+        groups[f'l{index}'] = (language, False)
+        groups[f's{index}'] = (language, True)
+        # Subtitle tags may be plural and glued to a name ("TamilESubs")
+        alternatives.append(f"(?P<s{index}>{sub_tag}s?(?![a-z]))")
+        # Full names may run into the next word ("TamilDubbed"), short codes
+        # must stand alone ("tel" in "hotel" is not Telugu)
+        alternatives.append(f"(?P<l{index}>{name_start}{language.lower()}|(?<![a-z]){code}(?![a-z]))")
+    alternatives.append(f"(?P<sub>{name_start}sub(?:s|bed)?(?![a-z]))")
+    return re.compile('|'.join(alternatives)), groups
+
+LANGUAGE_PATTERN, _GROUPS = _build_pattern()
+
+@lru_cache(maxsize=CACHE_SIZE)
+def detect_languages(file_name: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """All audio languages and subtitle tags in a file name, in order of appearance"""
+    if not file_name:
+        return (), ()
+    
+    languages = []
+    subtitles = []
+    generic_sub = False
+    
+    for match in LANGUAGE_PATTERN.finditer(file_name.lower()):
+        group = match.lastgroup
+        if group == 'sub':
+            generic_sub = True
+            continue
+        
+        language, is_sub = _GROUPS[group]
+        if is_sub:
+            tag = LANGUAGES[language][1].capitalize()
+            if tag not in subtitles:
+                subtitles.append(tag)
+        elif language not in languages:
+            languages.append(language)
+    
+    # Plain "Sub"/"Subs"/"Subbed" - assume subtitles in the first audio language
+    if generic_sub and not subtitles and languages:
+        subtitles.append(LANGUAGES[languages[0]][1].capitalize())
+    
+    return tuple(languages), tuple(subtitles)
+
+def extract_language_and_subtitle(file_name: str) -> tuple:
+    """Caption-ready language and subtitle strings - leech bot style"""
+    languages, subtitles = detect_languages(file_name)
+    return (" + ".join(languages) or "Unknown"), " ".join(subtitles)
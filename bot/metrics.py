@@ -0,0 +1,210 @@
+"""
+Metrics - counters and histograms served in Prometheus text format
+Recording is a dict update per file or per API batch, never per chunk, so the
+endpoint can stay on in production. Gauges that already live elsewhere (queue
+depth, FloodWait totals, transfer speed and ETA from bot/telemetry.py) are read
+from collectors at scrape time only.
+"""
+import time
+import asyncio
+from bisect import bisect_left
+from bot.config import Config
+
+PREFIX = "autorenamer_"
+
+def label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def reason_label(reason: str) -> str:
+    """Bounded label from a skip/failure reason, e.g. 'Blacklisted word: x' -> blacklisted_word"""
+    return reason.split(":")[0].strip().lower().replace(" ", "_") or "unknown"
+
+class Metric:
+    """A value per label set, optionally read from collect() on each scrape"""
+    
+    __slots__ = ('name', 'help', 'values', 'collect')
+    kind = "untyped"
+    
+    def __init__(self, name: str, help: str, collect=None):
+        self.name = PREFIX + name
+        self.help = help
+        self.values = {}
+        # collect() -> {labels tuple: value}, replaces values when scraped
+        self.collect = collect
+        _registry.append(self)
+    
+    def render(self) -> list:
+        values = self.values
+        if self.collect:
+            try:
+                values = self.collect()
+            except Exception as e:
+                print(f"Metrics collector {self.name} failed: {e}")
+                values = {}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in values.items():
+            lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+class Counter(Metric):
+    __slots__ = ()
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        key = label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    __slots__ = ()
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        self.values[label_key(labels)] = value
+
+class Histogram:
+    __slots__ = ('name', 'help', 'buckets', 'series')
+    
+    def __init__(self, name: str, help: str, buckets: tuple):
+        self.name = PREFIX + name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.series = {}
+        _registry.append(self)
+    
+    def observe(self, value: float, **labels):
+        key = label_key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+    
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+    
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(key, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+    
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe(time.monotonic() - self.started, **self.labels)
+
+_registry = []
+
+# ============ TRANSFERS ============
+files_total = Counter("files_total", "Files transferred, by direction and channel")
+bytes_total = Counter("bytes_total", "Bytes transferred, by direction and channel")
+skipped_total = Counter("skipped_total", "Files skipped, by reason")
+failed_total = Counter("failed_total", "Files that failed, by phase and reason")
+retries_total = Counter("retries_total", "Scan and transfer retries, by phase and error kind")
+
+TRANSFER_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600)
+scan_seconds = Histogram("scan_seconds", "Latency of one get_messages scan batch",
+                         (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+download_seconds = Histogram("download_seconds", "Time to download one file", TRANSFER_BUCKETS)
+upload_seconds = Histogram("upload_seconds", "Time to upload one file to all its destinations", TRANSFER_BUCKETS)
+
+# ============ EVENT LOOP ============
+loop_lag_seconds = Histogram("event_loop_lag_seconds", "Event loop lateness of a periodic timer",
+                             (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+loop_lag_max = Gauge("event_loop_lag_max_seconds", "Worst event loop lag since the last scrape")
+
+# ============ HANDLERS ============
+commands_total = Counter("commands_total", "Bot commands received, by command")
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    # Worst lag is per scrape interval
+    loop_lag_max.values.clear()
+    return "\n".join(lines) + "\n"
+
+async def watch_loop_lag():
+    """Sleep a fixed interval and record how late the loop woke us up"""
+    interval = Config.METRICS_LAG_INTERVAL
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.monotonic() - started - interval)
+        loop_lag_seconds.observe(lag)
+        loop_lag_max.set(max(lag, loop_lag_max.values.get((), 0.0)))
+
+async def handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        # Drain the headers, the request has no body
+        while (await asyncio.wait_for(reader.readline(), 5)).strip():
+            pass
+        
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"Not found\n"
+        
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+class MetricsServer:
+    def __init__(self):
+        self.server = None
+        self.lag_task = None
+    
+    async def start(self):
+        """Serve /metrics when METRICS_PORT is set"""
+        if not Config.METRICS_PORT:
+            return
+        self.lag_task = asyncio.create_task(watch_loop_lag())
+        self.server = await asyncio.start_server(handle_request, Config.METRICS_HOST, Config.METRICS_PORT)
+        print(f"📈 Metrics on http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+    
+    async def stop(self):
+        if self.lag_task:
+            self.lag_task.cancel()
+            self.lag_task = None
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+server = MetricsServer()
@@ -1,476 +1,920 @@
 import os
-import re
-import asyncio
 import time
+import asyncio
+from collections import deque
+from contextlib import aclosing
 from pyrogram.client import Client
-from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait
 from typing import List, Tuple
 from bot.config import Config
-from bot.filters import get_file_name, should_process_file, rename_file, has_downloadable_media
-from bot.thumbnail import get_thumbnail
+from bot.filters import get_file_name, get_file_id, get_file_unique_id, classify_files, has_downloadable_media
+from bot.thumbnail import get_thumbnail, group_by_thumbnail, refresh_thumbnails
+from bot.relay import relay_file
+from bot.downloader import download_parallel, IncompleteDownload
+from bot.splitter import upload_split_file
+from bot.sessions import pool, with_media
+from bot.queue import QueueItem
+from bot.retry import DeliveryFailed
+from bot.admission import disk_budget, next_admission, DiskFull
+from bot.language import extract_language_and_subtitle
+from bot.telemetry import TransferStats, JobStats
+from bot.status import ProgressBus, StatusRenderer, publish, format_bytes
+from bot import journal, dedup, metrics, retry, control
+
+def new_job_state() -> dict:
+    """Fresh per-job state - every job owns one, the UI renders from it"""
+    return {
+        'status': 'idle',
+        'current_index': 0,  # Files started so far (1-based)
+        'processed': 0,      # Completed files count
+        'total': 0,          # Total files in range
+        'cancel_all': False,
+        'queue': [],
+        'active': {},        # msg_id -> TransferStats of in-flight files
+        'skipped': 0,        # Skipped file count
+        'premium_count': 0,  # Premium files count (>2GB)
+        'to_process': 0,     # Files to process (total - skipped)
+        'scanned': 0,        # Message IDs scanned so far
+        'scan_total': 0,     # Message IDs in the requested range
+        'found': 0,          # Messages with media found while scanning
+        'scanning': False,   # Scan still running while files transfer
+        'disk_wait': 0,      # Bytes of the next file while it waits for disk space
+        'paused': False,     # Job paused from the status buttons
+        'held': [],          # Files paused from the status buttons
+        'in_flight': {},     # msg_id -> QueueItem of admitted files
+        'transfers': {},     # msg_id -> task of a file's running transfer
+        'cancelled': [],     # Waiting files cancelled, for the feeder to account
+        'wake': asyncio.Event(), # Wakes the feeder (scan progress, controls, finished files)
+        'bus': ProgressBus(), # Wakes the status renderer on changes
+        'job_stats': JobStats(), # Job-wide speed and ETA (see bot/telemetry.py)
+    }
+
+def parse_link(link: str) -> Tuple[int, int]:
+    """(chat_id, message_id) from a t.me/c/<chat>/<msg> style link"""
+    if '/c/' in link:
+        channel_id_str = link.split('/c/')[1].split('/')[0]
+        msg_id = int(link.split('/')[-1])
+        return int('-100' + channel_id_str), msg_id
+    
+    parts = link.split('/')
+    return int('-100' + str(int(parts[-2]))), int(parts[-1])
 
-# Global state
-current_status = {
-    'status': 'idle',
-    'file_name': None,
-    'current_size': 0,
-    'total_size': 0,
-    'current_index': 0,  # Current file being processed (1-based)
-    'processed': 0,      # Completed files count
-    'total': 0,          # Total files in range
-    'download_speed': 0,
-    'upload_speed': 0,
-    'cancel_all': False,
-    'queue': [],
-    'skipped': 0,        # Skipped file count
-    'premium_count': 0,  # Premium files count (>2GB)
-    'to_process': 0,     # Files to process (total - skipped)
-}
+async def fetch_chunk(client: Client, chat_id: int, msg_ids: List[int]) -> list:
+    """Fetch one chunk of message IDs, waiting out FloodWait"""
+    while True:
+        try:
+            msgs = await client.get_messages(chat_id, msg_ids)
+            return msgs if isinstance(msgs, list) else [msgs]
+        except FloodWait as e:
+            print(f"FloodWait while scanning: sleeping {e.value}s")
+            await asyncio.sleep(e.value)
+
+async def scan_batches(client: Client, state: dict, chat_id: int, start_id: int, end_id: int):
+    """Scan a message ID range, yielding each batch's media messages in order
+    
+    Up to SCAN_CONCURRENCY get_messages calls run ahead of the consumer, so
+    fetching overlaps with whatever the consumer does with earlier batches.
+    """
+    batch_size = max(1, min(Config.SCAN_BATCH_SIZE, 200))
+    chunk_starts = iter(range(start_id, end_id + 1, batch_size))
+    
+    state['scanned'] = 0
+    state['scan_total'] = max(0, end_id - start_id + 1)
+    state['found'] = 0
+    
+    async def fetch(msg_ids):
+        # A chunk that keeps failing fails the job: it is never journaled, so
+        # /resume scans it again
+        budget = retry.RetryBudget(f"messages {msg_ids[0]}-{msg_ids[-1]}")
+        try:
+            with metrics.scan_seconds.time():
+                msgs = await retry.attempt(state, budget, "scan", lambda: fetch_chunk(client, chat_id, msg_ids))
+        except Exception as e:
+            print(f"Error scanning {msg_ids[0]}-{msg_ids[-1]}: {e}")
+            raise
+        
+        found = [(msg.id, msg) for msg in msgs if msg and not msg.empty and has_downloadable_media(msg)]
+        state['scanned'] += len(msg_ids)
+        state['found'] += len(found)
+        publish(state)
+        return found
+    
+    def fetch_next(fetches):
+        chunk_start = next(chunk_starts, None)
+        if chunk_start is not None:
+            msg_ids = list(range(chunk_start, min(chunk_start + batch_size, end_id + 1)))
+            fetches.append(asyncio.create_task(fetch(msg_ids)))
+    
+    fetches = deque()
+    for _ in range(max(1, Config.SCAN_CONCURRENCY)):
+        fetch_next(fetches)
+    try:
+        while fetches and not state['cancel_all']:
+            found = await fetches.popleft()
+            fetch_next(fetches)
+            if found:
+                yield found
+    finally:
+        for task in fetches:
+            task.cancel()
 
-# Speed tracking
-dl_speed_data = {'last_time': 0, 'last_bytes': 0}
-ul_speed_data = {'last_time': 0, 'last_bytes': 0}
+def file_work(queue_item: QueueItem) -> int:
+    """Bytes of transfer work a file adds to its job (download + upload)"""
+    relayed = Config.STREAM_MODE and not queue_item.split
+    return queue_item.file_size * (1 if relayed else 2)
 
-def format_bytes(bytes_val: int) -> str:
-    val = float(bytes_val)
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if val < 1024:
-            return f"{val:.1f}{unit}"
-        val /= 1024
-    return f"{val:.1f}TB"
+def start_transfer(state: dict, queue_item: QueueItem, phase: str, total: int) -> TransferStats:
+    """Begin a phase of a file's transfer and show it in the status UI"""
+    transfer = queue_item.stats
+    if transfer is None:
+        transfer = queue_item.stats = TransferStats(queue_item.name, state['job_stats'])
+    transfer.begin(phase, total)
+    state['active'][queue_item.msg_id] = transfer
+    publish(state)
+    return transfer
 
-def get_progress_bar(current: int, total: int, width: int = 12) -> str:
-    if total == 0:
-        return "█" * width
-    percentage = current / total
-    filled = int(width * percentage)
-    bar = "█" * filled + "░" * (width - filled)
-    return bar
+def finish_transfer(state: dict, msg_id: int):
+    state['active'].pop(msg_id, None)
+    publish(state)
 
-def get_cancel_button():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("❌ Cancel All", callback_data="cancel_all_now")]
-    ])
+def settle_transfer(state: dict, queue_item: QueueItem, completed: bool):
+    """Account a file that left the pipeline in the job totals"""
+    transfer = queue_item.stats or TransferStats(queue_item.name)
+    state['job_stats'].settle(transfer, file_work(queue_item), completed)
 
-def extract_language_and_subtitle(file_name: str) -> tuple:
-    """Extract language and subtitle from filename - leech bot style"""
-    if not file_name:
-        return "Unknown", ""
-    
-    file_lower = file_name.lower()
+def make_progress(state: dict, transfer: TransferStats):
+    """Build a pyrogram progress callback that updates one transfer
     
-    # Language patterns - ORDERED FROM MOST SPECIFIC
-    lang_patterns = [
-        (r'\[?english\]?|\[?eng\]?|esub', ('English', 'Esub')),
-        (r'\[?hindi\]?|\[?hin\]?|hsub', ('Hindi', 'Hsub')),
-        (r'\[?telugu\]?|\[?tel\]?|tesub', ('Telugu', 'Tesub')),
-        (r'\[?kannada\]?|\[?kan\]?|ksub', ('Kannada', 'Ksub')),
-        (r'\[?tamil\]?|\[?tam\]?|tsub', ('Tamil', 'Tsub')),
-        (r'\[?malayalam\]?|\[?mal\]?|msub', ('Malayalam', 'Msub')),
-        (r'\[?punjabi\]?|\[?pan\]?|psub', ('Punjabi', 'Psub')),
-    ]
+    The callback is a coroutine so pyrogram awaits it on the event loop
+    instead of handing every chunk to its thread pool.
+    """
+    async def progress(current, total):
+        if state['cancel_all']:
+            return
+        # Only whole-percent steps are worth a status edit, not speed jitter
+        if transfer.update(current, total):
+            publish(state)
     
-    for pattern, (lang, sub_abbr) in lang_patterns:
-        if re.search(pattern, file_lower):
-            subtitle = sub_abbr if re.search(r'esub|hsub|tesub|ksub|tsub|msub|psub|sub', file_lower) else ""
-            return lang, subtitle
+    return progress
+
+def remove_download(path: str):
+    """Delete a downloaded file, its partial download and its per-message folder"""
+    try:
+        for name in (path, path + ".part"):
+            if os.path.exists(name):
+                os.remove(name)
+        os.rmdir(os.path.dirname(path))
+    except:
+        pass
+
+def build_caption(queue_item: QueueItem, file_size: int) -> str:
+    language, subtitle = extract_language_and_subtitle(queue_item.original_name)
     
-    return "Unknown", ""
+    caption_template = Config.CUSTOM_CAPTION or "{filename} | {language} {subtitle}"
+    return caption_template.format(
+        filename=queue_item.name,
+        filesize=format_bytes(file_size),
+        language=language,
+        subtitle=subtitle,
+        filecaption=queue_item.caption or ""
+    )
+
+def spool_size(queue_item: QueueItem) -> int:
+    """Disk space a file needs while in flight"""
+    if Config.STREAM_MODE and not queue_item.split:
+        # Relayed through memory, only an overflow spills to DOWNLOAD_DIR
+        return min(queue_item.file_size, Config.STREAM_SPILL_LIMIT)
+    return queue_item.file_size
 
-def get_status_text() -> str:
-    """Real-time progress UI with new design"""
-    global current_status
+def job_download_dir(job_id: int = None) -> str:
+    return os.path.join(Config.DOWNLOAD_DIR, str(job_id)) if job_id else Config.DOWNLOAD_DIR
+
+def download_path(queue_item: QueueItem, job_id: int = None) -> str:
+    # One folder per job and message keeps the renamed file name intact while
+    # several downloads (and jobs over the same range) run at once
+    return os.path.join(job_download_dir(job_id), str(queue_item.msg_id), queue_item.name)
+
+async def download_file(client: Client, state: dict, queue_item: QueueItem, job_id: int = None) -> str:
+    """Download one queue item into its own folder and return the local path
     
-    status = current_status['status']
-    file_name = current_status.get('file_name', 'Unknown')
-    current_index = current_status.get('current_index', 0)  # Which file we're on (1-based)
-    processed = current_status.get('processed', 0)  # Completed files
-    total = current_status.get('total', 0)
-    skipped = current_status.get('skipped', 0)
-    premium_count = current_status.get('premium_count', 0)
-    to_process = current_status.get('to_process', 0)
-    current_sz = current_status.get('current_size', 0)
-    total_sz = current_status.get('total_size', 0)
-    dl_speed = current_status.get('download_speed', 0)
-    ul_speed = current_status.get('upload_speed', 0)
-    queue = current_status.get('queue', [])
+    A large file that fails keeps its partial download, so a retry resumes
+    it. remove_download() cleans up once the file is given up.
+    """
+    msg_id = queue_item.msg_id
+    local_path = download_path(queue_item, job_id)
+    if queue_item.file_size and os.path.exists(local_path) and os.path.getsize(local_path) == queue_item.file_size:
+        # Downloaded in full before the file was paused
+        return local_path
+    transfer = start_transfer(state, queue_item, 'downloading', queue_item.file_size)
     
-    if status == 'idle':
-        return "✅ Ready to process"
+    async def download_media(session, file_id):
+        transfer.begin('downloading', queue_item.file_size)
+        if queue_item.file_size >= Config.PARALLEL_DOWNLOAD_THRESHOLD:
+            # Large files come down as concurrent byte ranges
+            if queue_item.resume is None:
+                queue_item.resume = {}
+            return await download_parallel(
+                session.client,
+                file_id,
+                local_path,
+                queue_item.file_size,
+                progress=make_progress(state, transfer),
+                resume=queue_item.resume
+            )
+        path = await session.client.download_media(
+            file_id,
+            file_name=local_path,
+            progress=make_progress(state, transfer)
+        )
+        # pyrogram logs a failed get_file and keeps what arrived, so a short
+        # file is a failed download, not a finished one
+        size = os.path.getsize(path) if path and os.path.exists(path) else 0
+        if not path or (queue_item.file_size and size != queue_item.file_size):
+            remove_download(local_path)
+            raise IncompleteDownload(f"Download ended at {size}/{queue_item.file_size} bytes")
+        return path
     
-    # Phase indicator
-    if status == 'downloading':
-        phase = "📥 DOWNLOADING"
-        speed = dl_speed
-        current_phase = "Downloading"
-    else:
-        phase = "📤 UPLOADING"
-        speed = ul_speed
-        current_phase = "Uploading"
+    async def download(session):
+        return await with_media(session, queue_item, lambda file_id: download_media(session, file_id))
     
-    # Progress calculation
-    progress_pct = (current_sz / total_sz * 100) if total_sz > 0 else 0
-    progress_bar = get_progress_bar(current_sz, total_sz)
+    started = time.monotonic()
+    try:
+        path = await pool.run(client, queue_item.file_size, download)
+    finally:
+        finish_transfer(state, msg_id)
     
-    # Calculate remaining files to process
-    remaining = total - processed - skipped
+    source_id = queue_item.chat_id
+    metrics.download_seconds.observe(time.monotonic() - started)
+    metrics.files_total.inc(direction="download", channel=source_id)
+    metrics.bytes_total.inc(queue_item.file_size, direction="download", channel=source_id)
+    return path
+
+async def upload_file(client: Client, state: dict, queue_item: QueueItem, path: str, job_id: int = None) -> list:
+    """Upload once per thumbnail, then fan out to the other destinations by file_id
     
-    # Build new UI - show current file index / total
-    text = f"<b>{phase}</b> {current_index}/{to_process}\n\n"
-    text += f"<b>📄 {file_name}</b>\n\n"
-    text += f"{progress_bar} <b>{progress_pct:.0f}%</b>\n"
-    text += f"<b>💾</b> {format_bytes(current_sz)} / {format_bytes(total_sz)}\n"
-    text += f"<b>🚀</b> {format_bytes(speed)}/s\n"
+    With no local path (STREAM_MODE) the first upload is relayed straight from
+    the source message instead of a downloaded file. The whole file goes
+    through one pooled session, since a file_id only works for the session
+    that uploaded it. Returns the destinations that received the file.
     
-    # Queue display - minimum 5 files
-    if queue:
-        text += f"\n<b>━━━━━━━━━━━━━━━━━━</b>\n"
-        text += f"<b>📋 QUEUE ({len(queue)}+):</b>\n"
-        
-        for i, q_file in enumerate(queue[:5]):
-            q_name = q_file['name']
-            skip_reason = q_file.get('skip_reason', None)
-            is_premium = q_file.get('premium', False)
-            
-            # Truncate name
-            if len(q_name) > 32:
-                name_parts = q_name.rsplit('.', 1)
-                if len(name_parts) == 2:
-                    base, ext = name_parts
-                    q_name = base[:28] + ".." + "." + ext
-                else:
-                    q_name = q_name[:32] + ".."
-            
-            # Determine indicator
-            if skip_reason:
-                indicator = f"✗ {q_name} (Skip - {skip_reason})"
-            elif is_premium:
-                indicator = f"⭐ {q_name} (Premium)"
-            else:
-                indicator = f"✓ {q_name}"
-            
-            text += f"  {i+1}. {indicator}\n"
+    DeliveryFailed is raised when some destinations were not reached, after
+    narrowing the item's destinations to those, so a retry only sends there.
+    """
+    msg_id = queue_item.msg_id
+    if path:
+        actual_size = os.path.getsize(path) if os.path.exists(path) else 0
+    else:
+        actual_size = queue_item.file_size
+    caption = build_caption(queue_item, actual_size)
+    source_id = queue_item.chat_id
+    transfer = start_transfer(state, queue_item, 'uploading', actual_size)
+    
+    def delivered(dest_channel):
+        sent.append(dest_channel)
+        journal.record_delivery(job_id, msg_id, dest_channel)
+        dedup.record(queue_item.file_unique_id, dest_channel, actual_size, queue_item.name)
+        metrics.files_total.inc(direction="upload", channel=dest_channel)
+        metrics.bytes_total.inc(actual_size, direction="upload", channel=dest_channel)
+    
+    async def upload(session):
+        session_client = session.client
+        # A failed-over attempt only covers destinations not reached yet, one
+        # real upload per thumbnail they use
+        groups = group_by_thumbnail(source_id, [dest for dest in targets if dest not in sent])
+        
+        if queue_item.split:
+            # Volumes of the downloaded file, uploaded in parallel
+            for remaining in groups:
+                if state['cancel_all']:
+                    return
+                await upload_split_file(
+                    session_client,
+                    path,
+                    queue_item.name,
+                    remaining,
+                    caption,
+                    thumb=get_thumbnail(source_id, remaining[0]),
+                    progress=make_progress(state, transfer),
+                    on_delivered=delivered
+                )
+            return
+        
+        async def upload_to(dest_channel):
+            """Real upload of the local file, returns the sent message or None"""
+            try:
+                transfer.begin('uploading', actual_size)
+                
+                if not path:
+                    return await with_media(session, queue_item, lambda file_id: relay_file(
+                        session_client,
+                        file_id,
+                        actual_size,
+                        queue_item.name,
+                        dest_channel,
+                        caption,
+                        thumb=get_thumbnail(source_id, dest_channel),
+                        progress=make_progress(state, transfer)
+                    ))
+                
+                return await session_client.send_document(
+                    dest_channel,
+                    path,
+                    caption=caption,
+                    thumb=get_thumbnail(source_id, dest_channel),
+                    progress=make_progress(state, transfer)
+                )
+            except FloodWait:
+                raise
+            except Exception as e:
+                if not state['cancel_all']:
+                    print(f"Upload to {dest_channel} failed: {e}")
+                    errors.append(e)
+                return None
         
-        if len(queue) > 5:
-            remaining_queue = len(queue) - 5
-            text += f"  <i>+{remaining_queue} more...</i>"
+        async def send_by_id(dest_channel, file_id):
+            """Re-post an already uploaded document, falling back to a real upload"""
+            try:
+                await session_client.send_document(dest_channel, file_id, caption=caption)
+                delivered(dest_channel)
+                return
+            except FloodWait:
+                raise
+            except Exception as e:
+                if state['cancel_all']:
+                    return
+                print(f"Send by file_id to {dest_channel} failed, uploading instead: {e}")
+            if await upload_to(dest_channel) is not None:
+                delivered(dest_channel)
+        
+        for remaining in groups:
+            # Upload to destinations one at a time until one returns a file_id
+            file_id = None
+            while remaining and file_id is None:
+                if state['cancel_all']:
+                    return
+                
+                dest_channel = remaining.pop(0)
+                sent_msg = await upload_to(dest_channel)
+                if sent_msg:
+                    delivered(dest_channel)
+                    document = getattr(sent_msg, 'document', None)
+                    file_id = document.file_id if document else None
+            
+            # The rest of the group reuses the uploaded bytes concurrently
+            if remaining and file_id and not state['cancel_all']:
+                results = await asyncio.gather(
+                    *(send_by_id(dest, file_id) for dest in remaining),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, FloodWait):
+                        raise result
+    
+    sent = []
+    errors = []
+    targets = list(queue_item.destinations or Config.DESTINATION_CHANNEL_IDS)
+    
+    try:
+        await pool.run(client, actual_size, upload)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        finish_transfer(state, msg_id)
+        # A retried or resumed upload only goes where the file is still missing
+        missing = [dest for dest in targets if dest not in sent]
+        if sent and missing:
+            queue_item.destinations = missing
+    
+    if missing and not state['cancel_all']:
+        queue_item.destinations = missing
+        error = errors[-1] if errors else None
+        reason = f": {error}" if error else ""
+        raise DeliveryFailed(f"Sent to {len(sent)}/{len(targets)} destinations{reason}") from error
+    return sent
+
+async def build_queue_items(job_id: int, batch: list, journaled: dict, seen_in_range: set) -> list:
+    """Queue items (with skip reasons) for one scanned batch of (msg_id, msg)
+    
+    seen_in_range carries the unique IDs of earlier batches, so a file posted
+    twice in one range is only transferred once.
+    """
+    queue_list = []
+    
+    # Rename and filter the batch in one pass over the compiled rules
+    file_names = [get_file_name(msg) for _, msg in batch]
+    classified = classify_files(file_names)
+    
+    # Duplicate index - one batched lookup per scanned batch
+    unique_ids = [get_file_unique_id(msg) for _, msg in batch]
+    already_delivered = await dedup.find_delivered(unique_ids) if Config.SKIP_DUPLICATES else {}
     
-    # Progress section with file counts
-    text += f"\n<b>━━━━━━━━━━━━━━━━━━</b>\n"
-    text += f"<b>📈 PROGRESS:</b>\n"
-    text += f"  ✅ Processed: {processed}\n"
-    text += f"  ⏳ Currently: {current_phase}\n"
-    text += f"  📌 Remaining: {remaining}\n"
-    text += f"\n<b>📊 FILE COUNTS:</b>\n"
-    text += f"  📥 Total Found: {total}\n"
-    text += f"  ✓ To Process: {to_process}\n"
-    text += f"  ⭐ Premium (>2GB): {premium_count}\n"
-    text += f"  ✗ Skipped: {skipped}"
+    for (msg_id, msg), file_name, unique_id, (processed_name, should_process, reason) in zip(
+        batch, file_names, unique_ids, classified
+    ):
+        file_size = 0
+        if msg.document:
+            file_size = msg.document.file_size
+        elif msg.video:
+            file_size = msg.video.file_size
+        elif msg.audio:
+            file_size = msg.audio.file_size
+        
+        SIZE_2GB = 2 * 1024 * 1024 * 1024
+        is_premium = file_size > SIZE_2GB
+        # Too big for one upload (2000 MiB, 4000 MiB with Premium) - post as
+        # volumes when splitting is enabled
+        upload_limit = (4000 if Config.PROCESS_ABOVE_2GB else 2000) * 1024 * 1024
+        split = Config.SPLIT_LARGE_FILES and file_size > upload_limit
+        
+        skip_reason = None
+        destinations = None
+        prior = journaled.get(msg_id)
+        
+        # Resumed item: only send to destinations it hasn't reached yet
+        if prior and prior[0] != journal.UPLOADED and prior[1]:
+            journal.set_delivered(job_id, msg_id, prior[1])
+            destinations = [d for d in Config.DESTINATION_CHANNEL_IDS if d not in prior[1]]
+        already_sent = (prior and prior[0] == journal.UPLOADED) or destinations == []
+        
+        # Skip destinations that already have this exact file from any run
+        duplicate = False
+        if Config.SKIP_DUPLICATES and unique_id and not already_sent:
+            delivered_to = already_delivered.get(unique_id)
+            if unique_id in seen_in_range:
+                duplicate = True
+            elif delivered_to:
+                targets = destinations if destinations is not None else Config.DESTINATION_CHANNEL_IDS
+                destinations = [d for d in targets if d not in delivered_to]
+                duplicate = not destinations
+        
+        if not should_process:
+            skip_reason = reason
+        elif is_premium and not Config.PROCESS_ABOVE_2GB and not split:
+            skip_reason = "Premium"
+        elif already_sent:
+            skip_reason = "Already sent"
+        elif duplicate:
+            skip_reason = "Duplicate"
+        
+        if skip_reason:
+            metrics.skipped_total.inc(reason=metrics.reason_label(skip_reason))
+        elif unique_id:
+            seen_in_range.add(unique_id)
+        
+        if not prior or prior[0] not in journal.DONE_STATES:
+            journal.record(job_id, msg_id, journal.SKIPPED if skip_reason else journal.QUEUED)
+        
+        # Add all files to queue (both processable and skip-marked), keeping
+        # only what the transfer needs so the message can be dropped
+        queue_list.append(QueueItem(
+            msg_id,
+            msg.chat.id,
+            get_file_id(msg),
+            unique_id,
+            file_size,
+            processed_name,
+            file_name,
+            caption=str(msg.caption) if msg.caption else None,
+            premium=is_premium,
+            split=split,
+            skip_reason=skip_reason,
+            destinations=destinations
+        ))
     
-    return text
+    return queue_list
 
-async def process_range(client: Client, start_link: str, end_link: str, status_message: Message):
-    """Main processor with dynamic captions and proper cancel handling"""
-    global current_status, dl_speed_data, ul_speed_data
+async def process_range(client: Client, job):
+    """Main processor with dynamic captions and proper cancel handling
+    
+    job carries id, start_link, end_link, status_message and its own state
+    dict (see bot/jobs.py). A job that already has journal items resumes.
+    """
+    state = job.state
+    job_id = job.id
+    start_link = job.start_link
+    end_link = job.end_link
+    status_message = job.status_message
     
-    current_status['cancel_all'] = False
-    current_status['status'] = 'fetching'
-    current_status['skipped'] = 0
+    state['status'] = 'fetching'
+    state['skipped'] = 0
+    state['current_index'] = 0
+    state['active'] = {}
+    
+    # Status message follows the job's progress bus
+    renderer = StatusRenderer(status_message, state, job_id)
+    renderer.start()
     
     try:
         # Parse links
-        if '/c/' in start_link:
-            channel_id_str = start_link.split('/c/')[1].split('/')[0]
-            start_id = int(start_link.split('/')[-1])
-            source_channel = int('-100' + channel_id_str)
-        else:
-            parts = start_link.split('/')
-            start_id = int(parts[-1])
-            source_id = int(parts[-2])
-            source_channel = int('-100' + str(source_id))
-        
-        if '/c/' in end_link:
-            end_id = int(end_link.split('/')[-1])
-        else:
-            end_id = int(end_link.split('/')[-1])
-        
-        # Fetch all messages
-        all_msgs = []
-        for msg_id in range(start_id, end_id + 1):
-            if current_status['cancel_all']:
-                break
+        source_channel, start_id = parse_link(start_link)
+        _, end_id = parse_link(end_link)
+        
+        # Thumbnails changed on disk since the last job, read once off the loop
+        await refresh_thumbnails()
+        
+        # Job journal - a resumed job restarts at its first incomplete item
+        journaled = await journal.load_items(job_id)
+        incomplete = [m for m, (item_state, _) in journaled.items() if item_state not in journal.DONE_STATES]
+        if incomplete:
+            start_id = max(start_id, min(incomplete))
+        elif journaled:
+            start_id = max(start_id, max(journaled) + 1)
+        
+        # Scan, classify and transfer run as one pipeline: each scanned batch
+        # is classified and handed to the feeder while later batches are still
+        # being fetched, so the first file starts after the first batch
+        state['processed'] = 0
+        state['total'] = 0
+        state['to_process'] = 0
+        state['premium_count'] = 0
+        state['job_stats'].total = 0
+        state['scanning'] = True
+        pipeline = asyncio.Queue(maxsize=max(1, Config.PIPELINE_BUFFER))
+        
+        async def produce():
+            seen_in_range = set()
             try:
-                msg = await client.get_messages(source_channel, msg_id)
-                if msg and has_downloadable_media(msg):
-                    all_msgs.append((msg_id, msg))
-            except:
-                pass
+                async with aclosing(scan_batches(client, state, source_channel, start_id, end_id)) as batches:
+                    async for batch in batches:
+                        items = await build_queue_items(job_id, batch, journaled, seen_in_range)
+                        for item in items:
+                            state['total'] += 1
+                            if item.skip_reason:
+                                state['skipped'] += 1
+                            else:
+                                state['to_process'] += 1
+                                state['job_stats'].total += file_work(item)
+                            if item.premium:
+                                state['premium_count'] += 1
+                        if items and state['status'] == 'fetching':
+                            state['status'] = 'processing'
+                        publish(state)
+                        
+                        # Blocks while the feeder is PIPELINE_BUFFER files behind
+                        for item in items:
+                            await pipeline.put(item)
+                            state['wake'].set()
+            finally:
+                state['scanning'] = False
+                publish(state)
+                # End marker for the feeder, which has stopped already on cancel
+                if not state['cancel_all']:
+                    await pipeline.put(None)
+                    state['wake'].set()
         
-        if not all_msgs:
-            return None, "❌ No files found in range"
+        # Pipeline: a feeder admits up to MAX_FILES_IN_FLIGHT files, download
+        # workers fill the upload queue, upload workers drain it
+        completed_count = 0
+        failed_count = 0
+        file_index = 0
         
-        # Build queue with skip reasons
-        queue_list = []
-        skipped_count = 0
+        download_workers = max(1, Config.DOWNLOAD_WORKERS)
+        upload_workers = max(1, Config.UPLOAD_WORKERS)
+        in_flight = asyncio.Semaphore(max(1, Config.MAX_FILES_IN_FLIGHT))
+        download_queue = asyncio.Queue()
+        upload_queue = asyncio.Queue()
         
-        for msg_id, msg in all_msgs:
-            file_name = get_file_name(msg)
-            should_process, reason = should_process_file(file_name)
-            
-            processed_name = rename_file(file_name)
-            
-            file_size = 0
-            if msg.document:
-                file_size = msg.document.file_size
-            elif msg.video:
-                file_size = msg.video.file_size
-            elif msg.audio:
-                file_size = msg.audio.file_size
-            
-            SIZE_2GB = 2 * 1024 * 1024 * 1024
-            is_premium = file_size > SIZE_2GB
-            
-            skip_reason = None
-            
-            if not should_process:
-                skip_reason = reason
-                skipped_count += 1
-            elif is_premium and not Config.PROCESS_ABOVE_2GB:
-                skip_reason = "Premium"
-                skipped_count += 1
-            
-            # Add all files to queue (both processable and skip-marked)
-            queue_list.append({
-                'msg_id': msg_id,
-                'msg': msg,
-                'name': processed_name,
-                'premium': is_premium,
-                'file_size': file_size,
-                'original_name': file_name,
-                'skip_reason': skip_reason,
-            })
-        
-        if not queue_list:
-            return None, "❌ No files found in range"
+        # Upload ordering: with PRESERVE_ORDER a file that finished downloading
+        # early is parked until every earlier file is done, so destinations
+        # receive files in source order without tying up an upload worker
+        next_upload = 0
+        finished_seqs = set()
+        parked = {}
         
-        # Count premium files
-        premium_count = sum(1 for item in queue_list if item.get('premium', False))
-        to_process_count = len(queue_list) - skipped_count
+        def release_turn(seq, queue_item, keep_spool=False):
+            """Give back a file's slot, disk reservation and upload turn"""
+            nonlocal next_upload
+            state['in_flight'].pop(queue_item.msg_id, None)
+            if not keep_spool:
+                release_spool(queue_item)
+            in_flight.release()
+            finished_seqs.add(seq)
+            while next_upload in finished_seqs:
+                finished_seqs.discard(next_upload)
+                next_upload += 1
+            if next_upload in parked:
+                upload_queue.put_nowait(parked.pop(next_upload))
+            # The feeder ends only once nothing is in flight
+            state['wake'].set()
         
-        # Initialize
-        current_status['total'] = len(queue_list)
-        current_status['processed'] = 0
-        current_status['skipped'] = skipped_count
-        current_status['premium_count'] = premium_count
-        current_status['to_process'] = to_process_count
-        current_status['queue'] = queue_list[1:] if len(queue_list) > 1 else []
+        def finish_turn(seq, queue_item, completed=False):
+            settle_transfer(state, queue_item, completed)
+            release_turn(seq, queue_item)
         
-        processed_count = 0
-        failed_count = 0
+        def release_spool(queue_item):
+            disk_budget.release(queue_item.spool)
+            queue_item.spool = 0
         
-        # Update UI task
-        update_running = True
-        last_update_text = ""
+        def skip_file(queue_item):
+            """A file cancelled from the status buttons counts as skipped"""
+            state['skipped'] += 1
+            state['to_process'] -= 1
+            journal.record(job_id, queue_item.msg_id, journal.SKIPPED, "Cancelled")
         
-        async def update_ui():
-            nonlocal update_running, last_update_text
-            first_update = True
-            
-            while update_running:
-                try:
-                    new_text = get_status_text()
-                    
-                    if first_update or new_text != last_update_text:
-                        await status_message.edit_text(
-                            new_text,
-                            reply_markup=get_cancel_button(),
-                            parse_mode=ParseMode.HTML
-                        )
-                        last_update_text = new_text
-                        first_update = False
-                except:
-                    pass
-                
-                if not update_running or current_status['cancel_all']:
-                    break
-                
-                await asyncio.sleep(3)
+        def drop_waiting(queue_item):
+            """Give up a file out of the pipeline, with what a paused turn left on disk"""
+            if queue_item.stats is not None:
+                remove_download(download_path(queue_item, job_id))
+            if queue_item.spool:
+                release_spool(queue_item)
         
-        update_task = asyncio.create_task(update_ui())
+        def stop_turn(seq, queue_item, path=None):
+            """End the turn of a file stopped by a control or a job cancel"""
+            halt, queue_item.halt = queue_item.halt, None
+            if state['cancel_all'] or halt == control.CANCEL:
+                remove_download(path or download_path(queue_item, job_id))
+                if not state['cancel_all']:
+                    skip_file(queue_item)
+                finish_turn(seq, queue_item)
+            else:
+                # Paused - the (partial) download stays for the next turn and
+                # keeps its disk reservation while it is there
+                path = path or download_path(queue_item, job_id)
+                on_disk = os.path.exists(path) or os.path.exists(path + ".part")
+                release_turn(seq, queue_item, keep_spool=bool(queue_item.spool) and on_disk)
+                if halt == control.HOLD:
+                    state['held'].append(queue_item)
+                else:
+                    state['queue'].insert(0, queue_item)
+            publish(state)
         
-        # Process files
-        completed_count = 0
-        current_file_index = 0  # Track current file position
-        for idx, queue_item in enumerate(queue_list):
-            if current_status['cancel_all']:
-                break
-            
-            msg_id = queue_item['msg_id']
-            msg = queue_item['msg']
-            file_name = queue_item['name']
-            original_name = queue_item['original_name']
-            skip_reason = queue_item.get('skip_reason')
-            
-            # Update queue display (show remaining files)
-            current_status['queue'] = queue_list[idx+1:] if idx+1 < len(queue_list) else []
-            
-            # Skip files that should not be processed
-            if skip_reason:
-                continue
-            
-            # Increment file index when starting to process a file
-            current_file_index += 1
-            current_status['current_index'] = current_file_index
-            
-            download_path = os.path.join(Config.DOWNLOAD_DIR, file_name)
+        async def run_transfer(queue_item, coro):
+            """Run one transfer phase as its own task, so a control can cancel it"""
+            task = asyncio.ensure_future(coro)
+            state['transfers'][queue_item.msg_id] = task
+            try:
+                return await task
+            finally:
+                state['transfers'].pop(queue_item.msg_id, None)
+        
+        def stopped(queue_item) -> bool:
+            return state['cancel_all'] or queue_item.halt is not None
+        
+        def wait_for_disk(size):
+            state['disk_wait'] = size
+            publish(state)
+        
+        async def reserve_disk(size) -> bool:
+            """Reserve disk space for a file, False if the feeder was woken first
             
+            Paused files hold their reservation, so the space being waited
+            for may only come back once the feeder handles a control.
+            """
+            acquire = asyncio.ensure_future(disk_budget.acquire(size, on_wait=lambda: wait_for_disk(size)))
+            woken = asyncio.ensure_future(state['wake'].wait())
             try:
-                # DOWNLOAD
-                current_status['status'] = 'downloading'
-                current_status['file_name'] = file_name
-                current_status['current_size'] = 0
-                current_status['total_size'] = queue_item['file_size']
-                current_status['download_speed'] = 0
-                
-                dl_speed_data['last_time'] = time.time()
-                dl_speed_data['last_bytes'] = 0
-                
-                def download_progress(current, total):
-                    if current_status['cancel_all']:
-                        return
-                    global dl_speed_data
-                    current_status['current_size'] = current
-                    current_status['total_size'] = total
-                    
-                    now = time.time()
-                    elapsed = now - dl_speed_data['last_time']
-                    
-                    if elapsed > 0.5 and elapsed > 0:
-                        bytes_in_period = current - dl_speed_data['last_bytes']
-                        current_status['download_speed'] = bytes_in_period / elapsed
-                        dl_speed_data['last_bytes'] = current
-                        dl_speed_data['last_time'] = now
+                await asyncio.wait((acquire, woken), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                woken.cancel()
+                acquire.cancel()
+                state['disk_wait'] = 0
+            try:
+                await acquire
+            except asyncio.CancelledError:
+                return False
+            return True
+        
+        async def feed():
+            nonlocal failed_count
+            seq = 0
+            # Scanned files not started yet - what the queue display shows and
+            # what ADMISSION_ORDER picks from
+            window = state['queue'] = []
+            wake = state['wake']
+            scan_done = False
+            while not state['cancel_all']:
+                wake.clear()
+                # Take in what was scanned meanwhile
+                while not scan_done and len(window) < pipeline.maxsize and not pipeline.empty():
+                    item = pipeline.get_nowait()
+                    if item is None:
+                        scan_done = True
+                    else:
+                        window.append(item)
+                while state['cancelled']:
+                    queue_item = state['cancelled'].pop()
+                    drop_waiting(queue_item)
+                    skip_file(queue_item)
+                    settle_transfer(state, queue_item, False)
                 
-                try:
-                    await client.download_media(msg, file_name=download_path, progress=download_progress)
-                except Exception as e:
-                    if current_status['cancel_all']:
-                        try:
-                            os.remove(download_path)
-                        except:
-                            pass
+                if state['paused'] or not window:
+                    # Paused files and files in flight may still come back
+                    if scan_done and not window and not state['held'] and not state['in_flight']:
                         break
-                    raise
+                    # Woken by the scan, a control or a file leaving the pipeline
+                    await wake.wait()
+                    continue
                 
-                if current_status['cancel_all']:
-                    try:
-                        os.remove(download_path)
-                    except:
-                        pass
-                    break
+                # seq follows admission order, so PRESERVE_ORDER posts in that order
+                queue_item = window.pop(next_admission(window))
+                publish(state)
                 
-                # UPLOAD
-                current_status['status'] = 'uploading'
-                current_status['current_size'] = 0
-                current_status['upload_speed'] = 0
+                # Skip files that should not be processed
+                if queue_item.skip_reason:
+                    continue
                 
-                actual_size = os.path.getsize(download_path) if os.path.exists(download_path) else 0
-                current_status['total_size'] = actual_size
+                # Controls find the file from here on, while it waits for a slot too
+                state['in_flight'][queue_item.msg_id] = queue_item
+                await in_flight.acquire()
                 
-                ul_speed_data['last_time'] = time.time()
-                ul_speed_data['last_bytes'] = 0
+                # Start the download only once it fits on disk - a paused file
+                # back for another turn may still hold its reservation
+                if not queue_item.spool:
+                    size = spool_size(queue_item)
+                    try:
+                        reserved = await reserve_disk(size)
+                    except DiskFull as e:
+                        print(f"Error: {e}")
+                        failed_count += 1
+                        metrics.failed_total.inc(phase="admission", reason="DiskFull")
+                        journal.record(job_id, queue_item.msg_id, journal.FAILED, str(e)[:200])
+                        settle_transfer(state, queue_item, False)
+                        state['in_flight'].pop(queue_item.msg_id, None)
+                        in_flight.release()
+                        continue
+                    
+                    if not reserved:
+                        # Woken while waiting - hand the file back and look again
+                        state['in_flight'].pop(queue_item.msg_id, None)
+                        in_flight.release()
+                        halt, queue_item.halt = queue_item.halt, None
+                        if halt == control.CANCEL:
+                            state['cancelled'].append(queue_item)
+                        elif halt == control.HOLD:
+                            state['held'].append(queue_item)
+                        else:
+                            window.insert(0, queue_item)
+                        continue
+                    queue_item.spool = size
                 
-                # Extract language and subtitle
-                language, subtitle = extract_language_and_subtitle(original_name)
+                if stopped(queue_item):
+                    # Stopped while waiting for a slot
+                    stop_turn(seq, queue_item)
+                else:
+                    await download_queue.put((seq, queue_item))
+                seq += 1
+            
+            # Paused files of a cancelled job may have (partial) downloads left
+            for queue_item in window + state['held']:
+                drop_waiting(queue_item)
+            
+            for _ in range(download_workers):
+                await download_queue.put(None)
+        
+        async def download_worker():
+            nonlocal file_index, failed_count
+            while True:
+                job = await download_queue.get()
+                if job is None:
+                    return
                 
-                # Build caption with variables
-                caption_template = Config.CUSTOM_CAPTION or "{filename} | {language} {subtitle}"
-                caption = caption_template.format(
-                    filename=file_name,
-                    filesize=format_bytes(actual_size),
-                    language=language,
-                    subtitle=subtitle,
-                    filecaption=msg.caption or ""
-                )
+                seq, queue_item = job
+                if stopped(queue_item):
+                    stop_turn(seq, queue_item)
+                    continue
                 
-                thumbnail = get_thumbnail()
+                if queue_item.stats is None:
+                    # Not counted again when a paused file starts over
+                    file_index += 1
+                    state['current_index'] = file_index
                 
-                def upload_progress(current, total):
-                    if current_status['cancel_all']:
-                        return
-                    global ul_speed_data
-                    current_status['current_size'] = current
-                    current_status['total_size'] = total if total > 0 else actual_size
-                    
-                    now = time.time()
-                    elapsed = now - ul_speed_data['last_time']
-                    
-                    if elapsed > 0.5 and elapsed > 0:
-                        bytes_in_period = current - ul_speed_data['last_bytes']
-                        current_status['upload_speed'] = bytes_in_period / elapsed
-                        ul_speed_data['last_bytes'] = current
-                        ul_speed_data['last_time'] = now
+                if Config.STREAM_MODE and not queue_item.split:
+                    # Relayed in the upload stage, nothing to download first
+                    await upload_queue.put((seq, queue_item, None))
+                    continue
                 
-                # Upload to destinations
-                for dest_channel in Config.DESTINATION_CHANNEL_IDS:
-                    if current_status['cancel_all']:
-                        break
-                    
-                    try:
-                        current_status['current_size'] = 0
-                        ul_speed_data['last_time'] = time.time()
-                        ul_speed_data['last_bytes'] = 0
-                        
-                        await client.send_document(
-                            dest_channel,
-                            download_path,
-                            caption=caption,
-                            thumb=thumbnail,
-                            progress=upload_progress
-                        )
-                    except Exception as e:
-                        if current_status['cancel_all']:
-                            break
-                        continue
+                try:
+                    path = await run_transfer(queue_item, retry.attempt(
+                        state, queue_item, "download",
+                        lambda: download_file(client, state, queue_item, job_id)
+                    ))
+                except asyncio.CancelledError:
+                    if not stopped(queue_item):
+                        raise
+                    stop_turn(seq, queue_item)
+                    continue
+                except Exception as e:
+                    if not state['cancel_all']:
+                        print(f"Error: {e}")
+                        failed_count += 1
+                        metrics.failed_total.inc(phase="download", reason=type(e).__name__)
+                        journal.record(job_id, queue_item.msg_id, journal.FAILED, str(e)[:200])
+                    remove_download(download_path(queue_item, job_id))
+                    finish_turn(seq, queue_item)
+                    continue
                 
-                if current_status['cancel_all']:
-                    try:
-                        os.remove(download_path)
-                    except:
-                        pass
-                    break
+                journal.record(job_id, queue_item.msg_id, journal.DOWNLOADED)
                 
-                # Cleanup
-                try:
-                    os.remove(download_path)
-                except:
-                    pass
+                if stopped(queue_item):
+                    stop_turn(seq, queue_item, path)
+                    continue
                 
-                # Only increment after SUCCESSFUL processing
-                completed_count += 1
-                current_status['processed'] = completed_count
+                await upload_queue.put((seq, queue_item, path))
+        
+        async def upload_worker():
+            nonlocal completed_count, failed_count
+            while True:
+                job = await upload_queue.get()
+                if job is None:
+                    return
                 
-            except Exception as e:
-                print(f"Error: {e}")
-                failed_count += 1
+                seq, queue_item, path = job
+                if Config.PRESERVE_ORDER and seq != next_upload:
+                    parked[seq] = job
+                    upload_queue.task_done()
+                    continue
+                
+                completed = False
+                halted = stopped(queue_item)
                 try:
-                    if os.path.exists(download_path):
-                        os.remove(download_path)
-                except:
-                    pass
-                if current_status['cancel_all']:
-                    break
+                    if halted:
+                        continue
+                    
+                    started = time.monotonic()
+                    # A failed attempt narrows the destinations to those not reached
+                    await run_transfer(queue_item, retry.attempt(
+                        state, queue_item, "upload",
+                        lambda: upload_file(client, state, queue_item, path, job_id)
+                    ))
+                    if state['cancel_all']:
+                        continue
+                    
+                    # Only increment after SUCCESSFUL processing
+                    journal.record(job_id, queue_item.msg_id, journal.UPLOADED)
+                    metrics.upload_seconds.observe(time.monotonic() - started)
+                    completed = True
+                    completed_count += 1
+                    state['processed'] = completed_count
+                    publish(state)
+                except asyncio.CancelledError:
+                    if not stopped(queue_item):
+                        raise
+                    halted = True
+                except DeliveryFailed as e:
+                    if state['cancel_all']:
+                        continue
+                    print(f"Error: {e}")
+                    failed_count += 1
+                    metrics.failed_total.inc(phase="upload", reason="partial_delivery")
+                    journal.record(job_id, queue_item.msg_id, journal.FAILED, str(e)[:200])
+                except Exception as e:
+                    print(f"Error: {e}")
+                    failed_count += 1
+                    metrics.failed_total.inc(phase="upload", reason=type(e).__name__)
+                    journal.record(job_id, queue_item.msg_id, journal.FAILED, str(e)[:200])
+                finally:
+                    if halted:
+                        stop_turn(seq, queue_item, path)
+                    else:
+                        if path:
+                            remove_download(path)
+                        finish_turn(seq, queue_item, completed)
+                    upload_queue.task_done()
         
-        # Stop update
-        update_running = False
+        producer = asyncio.create_task(produce())
+        downloaders = [asyncio.create_task(download_worker()) for _ in range(download_workers)]
+        uploaders = [asyncio.create_task(upload_worker()) for _ in range(upload_workers)]
         
-        current_status['status'] = 'idle'
-        current_status['queue'] = []
+        await feed()
+        if not producer.done():
+            # Cancelled while the range was still being scanned
+            producer.cancel()
+        await asyncio.gather(*downloaders)
+        # Parked files are re-queued as earlier ones finish, so wait for all
+        # of them before stopping the upload workers
+        await upload_queue.join()
+        for _ in range(upload_workers):
+            await upload_queue.put(None)
+        await asyncio.gather(*uploaders)
         
-        summary = f"✅ <b>Complete!</b>\n\n📊 <b>Results:</b>\n✅ Processed: {completed_count}\n⏭️ Skipped: {current_status['skipped']}\n❌ Failed: {failed_count}"
-        return None, summary
+        # A scan or classification error fails the job once in-flight files are done
+        scan_error = (await asyncio.gather(producer, return_exceptions=True))[0]
+        if isinstance(scan_error, Exception):
+            raise scan_error
+        
+        if not state['total'] and not state['cancel_all']:
+            state['status'] = 'idle'
+            await renderer.stop()
+            await journal.finish_job(job_id)
+            return None, "❌ No files found in range"
+        
+        state['status'] = 'idle'
+        state['queue'] = []
+        state['active'] = {}
+        await renderer.stop()
         
+        try:
+            os.rmdir(job_download_dir(job_id))
+        except OSError:
+            pass
+        
+        await journal.finish_job(job_id, 'cancelled' if state['cancel_all'] else 'done')
+        journal.forget_job(job_id)
+        
+        summary = f"✅ <b>Complete!</b> (Job #{job_id})\n\n📊 <b>Results:</b>\n✅ Processed: {completed_count}\n⏭️ Skipped: {state['skipped']}\n❌ Failed: {failed_count}"
+        return None, summary
+    
     except Exception as e:
-        current_status['status'] = 'idle'
+        state['status'] = 'idle'
+        await renderer.stop()
         return None, f"❌ Error: {str(e)[:100]}"
@@ -0,0 +1,40 @@
+"""
+Queue records - what a scanned file needs until it is transferred
+A record keeps the message ID, the media's file_id and the classified names
+and flags instead of the pyrogram Message, which is dropped after the scan.
+Transfers download by file_id and fetch the message again only when a
+session needs its own file_id or a file reference expired.
+"""
+class QueueItem:
+    __slots__ = (
+        'msg_id', 'chat_id', 'file_id', 'file_unique_id', 'file_size',
+        'name', 'original_name', 'caption', 'premium', 'split',
+        'skip_reason', 'destinations',
+        # Runtime, set while the file is in flight
+        'stats', 'spool', 'session_files', 'retries', 'resume', 'halt'
+    )
+    
+    def __init__(self, msg_id: int, chat_id: int, file_id: str, file_unique_id: str, file_size: int,
+                 name: str, original_name: str, caption: str = None, premium: bool = False,
+                 split: bool = False, skip_reason: str = None, destinations: list = None):
+        self.msg_id = msg_id
+        self.chat_id = chat_id
+        self.file_id = file_id
+        self.file_unique_id = file_unique_id
+        self.file_size = file_size
+        self.name = name
+        self.original_name = original_name
+        self.caption = caption
+        self.premium = premium
+        self.split = split
+        self.skip_reason = skip_reason
+        self.destinations = destinations
+        self.stats = None
+        self.spool = 0
+        self.session_files = None
+        self.retries = 0
+        self.resume = None
+        self.halt = None
+    
+    def __repr__(self):
+        return f"<QueueItem {self.chat_id}/{self.msg_id} {self.name!r}>"
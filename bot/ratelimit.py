@@ -0,0 +1,180 @@
+"""
+Rate limiter - token buckets shared by every Telegram API call
+Each call takes a token from its method's bucket and, for methods that post
+into a chat, from that chat's bucket. FloodWait opens a penalty window that
+every caller of the same method/chat waits out before the call is retried.
+"""
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pyrogram import raw
+from pyrogram.errors import FloodWait
+from bot.config import Config
+
+# Raw functions that post into (or edit in) a chat and count against its budget
+CHAT_METHODS = {
+    "SendMessage",
+    "SendMedia",
+    "SendMultiMedia",
+    "EditMessage",
+    "ForwardMessages",
+    "DeleteMessages",
+}
+
+_retry_flood = ContextVar("retry_flood", default=True)
+
+class TokenBucket:
+    """Refills at rate tokens per second up to burst, hands out reservations"""
+    
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    
+    def reserve(self, now: float) -> float:
+        """Take a token, returns seconds until it is actually available
+        
+        Tokens may go negative, so concurrent callers queue up behind each
+        other instead of all waking at the same moment.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class KeyStats:
+    __slots__ = ('calls', 'throttled', 'throttled_seconds', 'flood_waits', 'flood_seconds')
+    
+    def __init__(self):
+        self.calls = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.flood_waits = 0
+        self.flood_seconds = 0.0
+    
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def chat_limit(chat_id: int) -> tuple:
+    # Groups and channels allow far fewer messages per minute than private chats
+    return Config.GROUP_RATE_LIMIT if chat_id < 0 else Config.CHAT_RATE_LIMIT
+
+class RateLimiter:
+    def __init__(self):
+        self.buckets = {}
+        self.penalties = {}
+        self.stats = {}
+    
+    def _bucket(self, key) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            kind, name = key
+            if kind == 'chat':
+                rate, burst = chat_limit(name)
+            else:
+                rate, burst = Config.API_RATE_LIMITS.get(name, Config.API_RATE_LIMITS["default"])
+            bucket = self.buckets[key] = TokenBucket(rate, burst)
+        return bucket
+    
+    def _stats(self, key) -> KeyStats:
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = KeyStats()
+        return stats
+    
+    def _keys(self, method: str, chat_id: int = None) -> list:
+        keys = [('method', method)]
+        if chat_id is not None and method in CHAT_METHODS:
+            keys.append(('chat', chat_id))
+        return keys
+    
+    async def acquire(self, method: str, chat_id: int = None):
+        """Wait for a token (and any penalty window) for one call"""
+        keys = self._keys(method, chat_id)
+        for key in keys:
+            self._stats(key).calls += 1
+        
+        while True:
+            now = time.monotonic()
+            delay = 0.0
+            binding = None
+            for key in keys:
+                key_delay = max(self._bucket(key).reserve(now), self.penalties.get(key, 0) - now)
+                if key_delay > delay:
+                    delay = key_delay
+                    binding = key
+            
+            if not binding:
+                return
+            
+            # Throttled time is charged to the bucket that held the call back
+            stats = self._stats(binding)
+            stats.throttled += 1
+            stats.throttled_seconds += delay
+            await asyncio.sleep(delay)
+            
+            # A FloodWait that arrived meanwhile queues the call up again behind it
+            now = time.monotonic()
+            if all(self.penalties.get(key, 0) <= now for key in keys):
+                return
+    
+    def penalize(self, method: str, chat_id: int, seconds: float):
+        """FloodWait - hold back every call to this chat (or method) for a while"""
+        key = self._keys(method, chat_id)[-1]
+        now = time.monotonic()
+        self.penalties[key] = max(self.penalties.get(key, 0), now + seconds)
+        # Put the bucket in debt for the window, so calls resume one token at a
+        # time afterwards instead of all at once
+        bucket = self._bucket(key)
+        bucket.reserve(now)
+        bucket.tokens = min(bucket.tokens, 0) - seconds * bucket.rate
+        stats = self._stats(key)
+        stats.flood_waits += 1
+        stats.flood_seconds += seconds
+    
+    async def call(self, method: str, func, *args, chat_id: int = None, **kwargs):
+        """Run func under the method/chat budget, waiting out FloodWait and retrying"""
+        attempt = 0
+        while True:
+            await self.acquire(method, chat_id)
+            try:
+                return await func(*args, **kwargs)
+            except FloodWait as e:
+                self.penalize(method, chat_id, e.value)
+                attempt += 1
+                if not _retry_flood.get() or attempt > Config.FLOOD_RETRIES or e.value > Config.MAX_FLOOD_WAIT:
+                    raise
+                print(f"FloodWait on {method}: retrying in {e.value}s")
+    
+    def snapshot(self) -> dict:
+        """Counters per bucket, e.g. {'method:SendMedia': {...}, 'chat:-100123': {...}}"""
+        return {f"{kind}:{name}": stats.as_dict() for (kind, name), stats in self.stats.items()}
+    
+    def throttled_seconds(self) -> float:
+        return sum(stats.throttled_seconds + stats.flood_seconds for stats in self.stats.values())
+
+limiter = RateLimiter()
+
+@contextmanager
+def no_flood_retry():
+    """Calls in this block raise FloodWait (after penalizing) instead of waiting it out"""
+    token = _retry_flood.set(False)
+    try:
+        yield
+    finally:
+        _retry_flood.reset(token)
+
+def peer_chat_id(query) -> int | None:
+    """Bot API style chat id of the peer a raw query targets"""
+    peer = getattr(query, 'peer', None) or getattr(query, 'to_peer', None)
+    if isinstance(peer, raw.types.InputPeerChannel):
+        return -1000000000000 - peer.channel_id
+    if isinstance(peer, raw.types.InputPeerChat):
+        return -peer.chat_id
+    if isinstance(peer, raw.types.InputPeerUser):
+        return peer.user_id
+    return None
@@ -0,0 +1,265 @@
+"""
+Streaming relay - download chunks feed upload parts directly
+Files never land in DOWNLOAD_DIR unless the in-memory buffer is full
+"""
+import os
+import math
+import inspect
+import asyncio
+import tempfile
+from collections import deque
+from hashlib import md5
+from typing import BinaryIO
+from pyrogram import raw, types, utils
+from pyrogram.client import Client
+from pyrogram.session import Session
+from bot.config import Config
+from bot.downloader import IncompleteDownload
+
+PART_SIZE = 512 * 1024
+BIG_FILE_SIZE = 10 * 1024 * 1024
+UPLOAD_PART_WORKERS = 4
+
+class RelayBuffer:
+    """Bounded FIFO byte buffer that spills to a temp file when memory is full
+    
+    The spill file is a ring of at most max_spill bytes, its space is reused
+    as the upload drains it.
+    """
+    
+    def __init__(self, max_memory: int, max_spill: int, spill_dir: str):
+        self.max_memory = max_memory
+        self.max_spill = max_spill
+        self.spill_dir = spill_dir
+        self.segments = deque()  # bytes in memory, or (offset, length) in the spill file
+        self.memory_bytes = 0
+        self.spill_bytes = 0
+        self.spill_file = None
+        self.spill_read_pos = 0
+        self.closed = False
+        self.error = None
+        self.pending = b""
+        self.data_ready = asyncio.Event()
+        self.space_ready = asyncio.Event()
+    
+    def is_empty(self) -> bool:
+        return not self.memory_bytes and not self.spill_bytes
+    
+    def fits_memory(self, size: int) -> bool:
+        return self.memory_bytes + size <= self.max_memory
+    
+    def fits_spill(self, size: int) -> bool:
+        return self.spill_bytes + size <= self.max_spill
+    
+    async def write(self, chunk: bytes):
+        """Append a chunk, waiting while neither memory nor the spill ring has room for it
+        
+        An empty buffer takes any chunk, so one bigger than both budgets can't stall.
+        """
+        size = len(chunk)
+        while not (self.fits_memory(size) or self.fits_spill(size) or self.is_empty()):
+            self.space_ready.clear()
+            await self.space_ready.wait()
+        
+        if self.fits_memory(size) or not self.fits_spill(size):
+            self.segments.append(chunk)
+            self.memory_bytes += size
+        else:
+            if self.spill_file is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self.spill_file = tempfile.TemporaryFile(dir=self.spill_dir)
+            offset = (self.spill_read_pos + self.spill_bytes) % self.max_spill
+            # Wrap around to the start of the ring when the chunk runs past its end
+            head = min(size, self.max_spill - offset)
+            self.spill_file.seek(offset)
+            self.spill_file.write(chunk[:head])
+            if head < size:
+                self.spill_file.seek(0)
+                self.spill_file.write(chunk[head:])
+            self.segments.append((offset, size))
+            self.spill_bytes += size
+        
+        self.data_ready.set()
+    
+    def close(self, error: Exception = None):
+        self.closed = True
+        self.error = error
+        self.data_ready.set()
+    
+    def _pop_segment(self) -> bytes:
+        segment = self.segments.popleft()
+        if isinstance(segment, bytes):
+            self.memory_bytes -= len(segment)
+        else:
+            offset, length = segment
+            head = min(length, self.max_spill - offset)
+            self.spill_file.seek(offset)
+            segment = self.spill_file.read(head)
+            if head < length:
+                self.spill_file.seek(0)
+                segment += self.spill_file.read(length - head)
+            self.spill_bytes -= length
+            self.spill_read_pos = (offset + length) % self.max_spill
+            if self.spill_bytes == 0:
+                # Spill file fully drained - give the disk space back
+                self.spill_file.truncate(0)
+                self.spill_read_pos = 0
+        
+        self.space_ready.set()
+        return segment
+    
+    async def read(self, size: int) -> bytes:
+        """Read exactly size bytes, or fewer only at end of stream"""
+        data = self.pending
+        while len(data) < size:
+            if self.segments:
+                data += self._pop_segment()
+                continue
+            if self.error:
+                raise self.error
+            if self.closed:
+                break
+            self.data_ready.clear()
+            await self.data_ready.wait()
+        
+        self.pending = data[size:]
+        return data[:size]
+    
+    def discard(self):
+        self.segments.clear()
+        self.memory_bytes = 0
+        self.spill_bytes = 0
+        self.spill_read_pos = 0
+        self.pending = b""
+        if self.spill_file:
+            self.spill_file.close()
+            self.spill_file = None
+        self.space_ready.set()
+
+async def feed_buffer(client: Client, message: types.Message | str, buffer: RelayBuffer):
+    """Stream a message's media into the relay buffer"""
+    try:
+        async for chunk in client.stream_media(message):
+            await buffer.write(chunk)
+        buffer.close()
+    except Exception as e:
+        buffer.close(e)
+
+async def upload_stream(client: Client, buffer: RelayBuffer, file_size: int, file_name: str, progress=None):
+    """Upload file parts as they arrive in the buffer and return the InputFile"""
+    file_total_parts = int(math.ceil(file_size / PART_SIZE))
+    is_big = file_size > BIG_FILE_SIZE
+    file_id = client.rnd_id()
+    md5_sum = md5() if not is_big else None
+    
+    session = Session(
+        client, await client.storage.dc_id(), await client.storage.auth_key(),
+        await client.storage.test_mode(), is_media=True
+    )
+    parts = asyncio.Queue(UPLOAD_PART_WORKERS)
+    errors = []
+    
+    async def worker():
+        while True:
+            rpc = await parts.get()
+            if rpc is None:
+                return
+            try:
+                await session.invoke(rpc)
+            except Exception as e:
+                errors.append(e)
+    
+    await session.start()
+    workers = [asyncio.create_task(worker()) for _ in range(UPLOAD_PART_WORKERS if is_big else 1)]
+    
+    try:
+        file_part = 0
+        while file_part < file_total_parts:
+            if errors:
+                raise errors[0]
+            
+            chunk = await buffer.read(PART_SIZE)
+            if not chunk:
+                raise IncompleteDownload(f"Stream ended at part {file_part}/{file_total_parts}")
+            
+            if is_big:
+                rpc = raw.functions.upload.SaveBigFilePart(
+                    file_id=file_id,
+                    file_part=file_part,
+                    file_total_parts=file_total_parts,
+                    bytes=chunk
+                )
+            else:
+                rpc = raw.functions.upload.SaveFilePart(
+                    file_id=file_id,
+                    file_part=file_part,
+                    bytes=chunk
+                )
+                md5_sum.update(chunk)
+            
+            await parts.put(rpc)
+            file_part += 1
+            
+            if progress:
+                result = progress(min(file_part * PART_SIZE, file_size), file_size)
+                if inspect.isawaitable(result):
+                    await result
+    finally:
+        for _ in workers:
+            await parts.put(None)
+        await asyncio.gather(*workers)
+        await session.stop()
+    
+    if errors:
+        raise errors[0]
+    
+    if is_big:
+        return raw.types.InputFileBig(id=file_id, parts=file_total_parts, name=file_name)
+    return raw.types.InputFile(
+        id=file_id,
+        parts=file_total_parts,
+        name=file_name,
+        md5_checksum=md5_sum.hexdigest()
+    )
+
+async def send_uploaded_document(client: Client, chat_id, input_file, file_name: str, caption: str, thumb: BinaryIO | None = None):
+    """Post an already uploaded InputFile as a document and return the Message"""
+    media = raw.types.InputMediaUploadedDocument(
+        mime_type=client.guess_mime_type(file_name) or "application/zip",
+        file=input_file,
+        thumb=await client.save_file(thumb),
+        attributes=[raw.types.DocumentAttributeFilename(file_name=file_name)]
+    )
+    
+    r = await client.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await client.resolve_peer(chat_id),
+            media=media,
+            random_id=client.rnd_id(),
+            **await utils.parse_text_entities(client, caption, None, None)
+        )
+    )
+    
+    for update in r.updates:
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(
+                client, update.message,
+                {u.id: u for u in r.users},
+                {c.id: c for c in r.chats}
+            )
+    return None
+
+async def relay_file(client: Client, message: types.Message | str, file_size: int, file_name: str,
+                     dest_channel, caption: str, thumb: BinaryIO | None = None, progress=None):
+    """Stream one message's media straight into a new document in dest_channel"""
+    buffer = RelayBuffer(Config.STREAM_BUFFER_SIZE, Config.STREAM_SPILL_LIMIT, Config.DOWNLOAD_DIR)
+    feeder = asyncio.create_task(feed_buffer(client, message, buffer))
+    
+    try:
+        input_file = await upload_stream(client, buffer, file_size, file_name, progress)
+        await feeder
+        return await send_uploaded_document(client, dest_channel, input_file, file_name, caption, thumb)
+    finally:
+        if not feeder.done():
+            feeder.cancel()
+        buffer.discard()
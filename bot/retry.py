@@ -0,0 +1,90 @@
+"""
+Retry policy - failed transfers are retried by error kind
+FloodWait is waited out, network errors back off exponentially with jitter,
+anything else fails the file at once. Every file has RETRY_ATTEMPTS retries
+shared by its download and upload, files still failing stay in the journal
+for /retry.
+"""
+import random
+import asyncio
+from pyrogram.errors import FloodWait, InternalServerError, ServiceUnavailable
+from bot.config import Config
+from bot.admission import DiskFull
+from bot.queue import QueueItem
+from bot import metrics
+
+# Error kinds
+FLOOD = "flood"
+NETWORK = "network"
+PERMANENT = "permanent"
+
+class DeliveryFailed(Exception):
+    """Some destinations were not reached, raised from the error that stopped them"""
+
+class RetryBudget:
+    """Retries of work that is not a file, such as one scan chunk"""
+    __slots__ = ('name', 'retries')
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.retries = 0
+
+def classify(error: BaseException) -> str:
+    # A partial delivery is as retryable as what interrupted it
+    while isinstance(error, DeliveryFailed):
+        if error.__cause__ is None:
+            return NETWORK
+        error = error.__cause__
+    if isinstance(error, FloodWait):
+        return FLOOD
+    if isinstance(error, DiskFull):
+        return PERMANENT
+    if isinstance(error, (InternalServerError, ServiceUnavailable, OSError, asyncio.TimeoutError)):
+        return NETWORK
+    return PERMANENT
+
+def backoff(attempt: int) -> float:
+    """Delay before retry number attempt: doubling, capped, half of it random"""
+    delay = min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def retry_delay(queue_item: QueueItem | RetryBudget, error: BaseException) -> float | None:
+    """Seconds to wait before retrying the file, None to give up on it"""
+    kind = classify(error)
+    if kind == PERMANENT or queue_item.retries >= Config.RETRY_ATTEMPTS:
+        return None
+    if kind == FLOOD:
+        while isinstance(error, DeliveryFailed):
+            error = error.__cause__
+        if error.value > Config.MAX_FLOOD_WAIT:
+            return None
+        return error.value + random.uniform(0, 1)
+    return backoff(queue_item.retries + 1)
+
+async def wait(state: dict, delay: float):
+    """Sleep delay seconds, waking up early when the job is cancelled"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + delay
+    while not state['cancel_all'] and loop.time() < deadline:
+        await asyncio.sleep(min(1, deadline - loop.time()))
+
+async def attempt(state: dict, queue_item: QueueItem | RetryBudget, phase: str, func):
+    """Await func() until it succeeds, retrying within the file's budget
+    
+    The last error is raised when it is permanent, the budget is used up or
+    the job was cancelled.
+    """
+    while True:
+        try:
+            return await func()
+        except Exception as e:
+            delay = None if state['cancel_all'] else retry_delay(queue_item, e)
+            if delay is None:
+                raise
+            queue_item.retries += 1
+            metrics.retries_total.inc(phase=phase, kind=classify(e))
+            print(f"{phase.capitalize()} of {queue_item.name} failed ({e}), "
+                  f"retry {queue_item.retries}/{Config.RETRY_ATTEMPTS} in {delay:.0f}s")
+            await wait(state, delay)
+            if state['cancel_all']:
+                raise
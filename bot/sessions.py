@@ -0,0 +1,177 @@
+"""
+Session pool - helper bots and user sessions that share the transfer work
+Every file goes to the least-loaded session. A session hitting FloodWait cools
+down and its file fails over to another session.
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from pyrogram.client import Client
+from pyrogram.errors import FloodWait, FileReferenceExpired, FileReferenceInvalid
+from bot.config import Config
+from bot.client import RateLimitedClient
+from bot.downloader import IncompleteDownload
+from bot.filters import get_file_id
+from bot.queue import QueueItem
+from bot.ratelimit import RateLimiter, limiter, no_flood_retry
+from bot import metrics
+
+class PooledSession:
+    __slots__ = ('name', 'client', 'active', 'bytes_in_flight', 'files', 'cooldown_until')
+    
+    def __init__(self, name: str, client: Client):
+        self.name = name
+        self.client = client
+        self.active = 0
+        self.bytes_in_flight = 0
+        self.files = 0
+        self.cooldown_until = 0.0
+
+def build_helpers() -> list:
+    """Clients for the helper bot tokens and session strings in Config"""
+    helpers = []
+    for index, token in enumerate(Config.HELPER_BOT_TOKENS, start=1):
+        helpers.append(RateLimitedClient(
+            f"helper_bot_{index}",
+            api_id=Config.API_ID,
+            api_hash=Config.API_HASH,
+            bot_token=token,
+            workdir=".",
+            no_updates=True,
+            sleep_threshold=0,
+            max_concurrent_transmissions=Config.MAX_TRANSMISSIONS,
+            limiter=RateLimiter()
+        ))
+    for index, session_string in enumerate(Config.HELPER_SESSION_STRINGS, start=1):
+        helpers.append(RateLimitedClient(
+            f"helper_user_{index}",
+            api_id=Config.API_ID,
+            api_hash=Config.API_HASH,
+            session_string=session_string,
+            in_memory=True,
+            no_updates=True,
+            sleep_threshold=0,
+            max_concurrent_transmissions=Config.MAX_TRANSMISSIONS,
+            limiter=RateLimiter()
+        ))
+    return helpers
+
+class SessionPool:
+    def __init__(self):
+        self.sessions = []
+    
+    async def start(self, app: Client):
+        """Start the helper sessions next to the already started bot client"""
+        self.sessions = [PooledSession("main", app)]
+        for helper in build_helpers():
+            try:
+                await helper.start()
+                self.sessions.append(PooledSession(helper.name, helper))
+                print(f"✅ Helper session {helper.name} started")
+            except Exception as e:
+                print(f"❌ Helper session {helper.name} failed to start: {e}")
+    
+    async def stop(self):
+        for session in self.sessions[1:]:
+            try:
+                await session.client.stop()
+            except Exception as e:
+                print(f"Error stopping {session.name}: {e}")
+        self.sessions = []
+    
+    def members(self, client: Client) -> list:
+        # Without a started pool (or helpers) the caller's client works alone
+        if self.sessions and self.sessions[0].client is client:
+            return self.sessions
+        return [PooledSession("main", client)]
+    
+    @asynccontextmanager
+    async def session(self, client: Client, size: int = 0):
+        """Hold the least-loaded session that is not cooling down"""
+        members = self.members(client)
+        while True:
+            now = time.monotonic()
+            available = [s for s in members if s.cooldown_until <= now]
+            if available:
+                break
+            await asyncio.sleep(min(s.cooldown_until for s in members) - now)
+        
+        # Idle sessions take turns, so work spreads even when it is sequential
+        session = min(available, key=lambda s: (s.active, s.bytes_in_flight, s.files))
+        session.active += 1
+        session.bytes_in_flight += size
+        session.files += 1
+        try:
+            yield session
+        finally:
+            session.active -= 1
+            session.bytes_in_flight -= size
+    
+    async def run(self, client: Client, size: int, func):
+        """Run func(session) on a pooled session, failing over on FloodWait
+        
+        With a single session there is nothing to fail over to, so the rate
+        limiter waits FloodWait out as usual.
+        """
+        members = self.members(client)
+        if len(members) == 1:
+            async with self.session(client, size) as session:
+                return await func(session)
+        
+        while True:
+            async with self.session(client, size) as session:
+                try:
+                    with no_flood_retry():
+                        return await func(session)
+                except FloodWait as e:
+                    session.cooldown_until = time.monotonic() + e.value
+                    print(f"FloodWait on {session.name} ({e.value}s), failing over")
+
+async def session_media(session: PooledSession, item: QueueItem, refresh: bool = False) -> str:
+    """The queue item's file_id as seen by this session
+    
+    file_ids and file references are bound to the session that fetched the
+    message, so helpers fetch their own copy (once per item). refresh fetches
+    the message again after its file reference expired.
+    """
+    if session.name == "main" and not refresh:
+        return item.file_id
+    
+    files = item.session_files
+    if files is None:
+        files = item.session_files = {}
+    if refresh or session.name not in files:
+        msg = await session.client.get_messages(item.chat_id, item.msg_id)
+        files[session.name] = get_file_id(msg)
+        if session.name == "main":
+            item.file_id = files[session.name]
+    return files[session.name]
+
+async def with_media(session: PooledSession, item: QueueItem, func):
+    """Run func(file_id) for the item, once more with a fresh file_id if the reference expired
+    
+    Downloads rarely see FileReferenceExpired itself, pyrogram swallows it and
+    the media just ends short, so that gets a fresh file_id as well.
+    """
+    try:
+        return await func(await session_media(session, item))
+    except (FileReferenceExpired, FileReferenceInvalid, IncompleteDownload) as e:
+        print(f"Media of {item.name} failed on {session.name} ({e}), fetching the message again")
+        return await func(await session_media(session, item, refresh=True))
+
+pool = SessionPool()
+
+def limiter_totals(field: str) -> dict:
+    """Sum of one rate limiter counter per session, read on scrape"""
+    limiters = [(s.name, s.client.limiter) for s in pool.sessions] or [("main", limiter)]
+    return {
+        (('session', name),): sum(getattr(stats, field) for stats in session_limiter.stats.values())
+        for name, session_limiter in limiters
+    }
+
+metrics.Counter("floodwait_seconds_total", "FloodWait seconds imposed by Telegram, by session",
+                collect=lambda: limiter_totals('flood_seconds'))
+metrics.Counter("floodwaits_total", "FloodWait errors, by session",
+                collect=lambda: limiter_totals('flood_waits'))
+metrics.Counter("throttled_seconds_total", "Seconds calls waited for a rate limit token, by session",
+                collect=lambda: limiter_totals('throttled_seconds'))
@@ -0,0 +1,153 @@
+"""
+Split uploads - files above the upload limit posted as .001/.002 volumes
+Volumes are slices of the downloaded file read in place, so splitting needs
+no extra disk space. Parts upload in parallel and are posted in order.
+"""
+import os
+import io
+import asyncio
+import inspect
+from typing import BinaryIO
+from pyrogram.client import Client
+from pyrogram.errors import FloodWait
+from bot.config import Config
+from bot.relay import send_uploaded_document
+
+class IncompleteUpload(IOError):
+    """Volume upload failed - pyrogram logs and swallows save_file errors
+    and returns None"""
+
+class FileSlice(io.RawIOBase):
+    """Read-only window [offset, offset + length) of a file, seekable like a file"""
+    
+    def __init__(self, path: str, offset: int, length: int, name: str):
+        super().__init__()
+        self.name = name
+        self._file = open(path, "rb")
+        self._offset = offset
+        self._length = length
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, position: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            position += self._position
+        elif whence == os.SEEK_END:
+            position += self._length
+        self._position = max(0, min(position, self._length))
+        return self._position
+    
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._length - self._position)
+        if size <= 0:
+            return 0
+        self._file.seek(self._offset + self._position)
+        read = self._file.readinto(memoryview(buffer)[:size])
+        self._position += read
+        return read
+    
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+def split_plan(file_size: int, part_size: int) -> list[tuple[int, int]]:
+    """(offset, length) of each volume"""
+    return [(offset, min(part_size, file_size - offset)) for offset in range(0, file_size, part_size)]
+
+def part_name(file_name: str, index: int) -> str:
+    return f"{file_name}.{index:03d}"
+
+def part_caption(caption: str, index: int, count: int, first_link: str = None) -> str:
+    text = f"{caption}\n\n📦 Part {index}/{count}"
+    if first_link:
+        text += f" · <a href=\"{first_link}\">Part 1</a>"
+    return text
+
+def first_part_caption(caption: str, messages: list) -> str:
+    """Part 1 caption once every part is posted - links to the whole set"""
+    links = " ".join(f"<a href=\"{msg.link}\">{index}</a>" for index, msg in enumerate(messages, start=1))
+    return f"{caption}\n\n📦 Part 1/{len(messages)} · Parts: {links}"
+
+async def upload_parts(client: Client, path: str, file_name: str, part_size: int, progress=None) -> list:
+    """Upload every volume concurrently, returns InputFiles in volume order"""
+    plan = split_plan(os.path.getsize(path), part_size)
+    total = sum(length for _, length in plan)
+    uploaded = [0] * len(plan)
+    
+    async def upload(index, offset, length):
+        async def part_progress(current, _):
+            uploaded[index] = current
+            if progress:
+                result = progress(sum(uploaded), total)
+                if inspect.isawaitable(result):
+                    await result
+        
+        with FileSlice(path, offset, length, part_name(file_name, index + 1)) as volume:
+            input_file = await client.save_file(volume, progress=part_progress)
+        if input_file is None:
+            raise IncompleteUpload(f"Upload of {part_name(file_name, index + 1)} failed")
+        return input_file
+    
+    return await asyncio.gather(*(upload(index, offset, length) for index, (offset, length) in enumerate(plan)))
+
+async def upload_split_file(client: Client, path: str, file_name: str, destinations: list, caption: str,
+                            thumb: BinaryIO | None = None, progress=None, on_delivered=None) -> list:
+    """Post a file as numbered volumes to every destination
+    
+    The volumes are uploaded once and posted in order to the first
+    destination, the other destinations get them by file_id. Returns the
+    destinations that received the whole set.
+    """
+    part_size = Config.SPLIT_PART_SIZE
+    input_files = await upload_parts(client, path, file_name, part_size, progress)
+    count = len(input_files)
+    names = [part_name(file_name, index) for index in range(1, count + 1)]
+    delivered = []
+    
+    async def finish(dest_channel, messages):
+        if count > 1:
+            await client.edit_message_caption(dest_channel, messages[0].id, first_part_caption(caption, messages))
+        delivered.append(dest_channel)
+        if on_delivered:
+            on_delivered(dest_channel)
+    
+    # First destination - post the uploaded volumes in order
+    first_dest = destinations[0]
+    messages = []
+    for index, (input_file, name) in enumerate(zip(input_files, names), start=1):
+        first_link = messages[0].link if messages else None
+        messages.append(await send_uploaded_document(
+            client, first_dest, input_file, name, part_caption(caption, index, count, first_link), thumb
+        ))
+    await finish(first_dest, messages)
+    
+    file_ids = [msg.document.file_id for msg in messages]
+    
+    async def send_copy(dest_channel):
+        copies = []
+        for index, file_id in enumerate(file_ids, start=1):
+            first_link = copies[0].link if copies else None
+            copies.append(await client.send_document(
+                dest_channel, file_id, caption=part_caption(caption, index, count, first_link)
+            ))
+        await finish(dest_channel, copies)
+    
+    # Other destinations reuse the uploaded volumes concurrently
+    results = await asyncio.gather(*(send_copy(dest) for dest in destinations[1:]), return_exceptions=True)
+    for dest_channel, result in zip(destinations[1:], results):
+        if isinstance(result, FloodWait):
+            # Let the session pool fail the remaining destinations over
+            raise result
+        if isinstance(result, Exception):
+            print(f"Split upload to {dest_channel} failed: {result}")
+    
+    return delivered
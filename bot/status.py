@@ -0,0 +1,376 @@
+"""
+Status messages - progress bus and FloodWait-aware renderer
+Transfers publish to the job's bus, the renderer coalesces events into as few
+edits as the shared edit budget allows and rebuilds only changed sections
+"""
+import time
+import asyncio
+from itertools import islice
+from pyrogram.errors import FloodWait, MessageNotModified
+from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.enums import ParseMode
+from bot.config import Config
+from bot.telemetry import TransferStats, format_eta
+from bot.ratelimit import no_flood_retry
+
+RULE = "<b>━━━━━━━━━━━━━━━━━━</b>"
+QUEUE_PREVIEW = 5
+MAX_FILE_BUTTONS = 5
+
+def format_bytes(bytes_val: int) -> str:
+    val = float(bytes_val)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if val < 1024:
+            return f"{val:.1f}{unit}"
+        val /= 1024
+    return f"{val:.1f}TB"
+
+def get_progress_bar(current: int, total: int, width: int = 12) -> str:
+    if total == 0:
+        return "█" * width
+    percentage = current / total
+    filled = int(width * percentage)
+    bar = "█" * filled + "░" * (width - filled)
+    return bar
+
+def control_rows(state: dict, job_id: int) -> tuple:
+    """(label, callback data) rows of a job's control buttons
+    
+    Data is "ctl:<job_id>:<action>" for the job and
+    "ctl:<job_id>:<action>:<msg_id>" for one file (see bot/control.py).
+    """
+    if state['status'] == 'queued':
+        return ((("❌ Cancel", f"ctl:{job_id}:cancel"),),)
+    
+    rows = []
+    for msg_id, queue_item in list(state['in_flight'].items())[:MAX_FILE_BUTTONS]:
+        name = truncate_name(queue_item.name, 20)
+        rows.append((
+            (f"⏸ {name}", f"ctl:{job_id}:pause:{msg_id}"),
+            ("❌", f"ctl:{job_id}:cancel:{msg_id}"),
+        ))
+    for queue_item in state['held'][:MAX_FILE_BUTTONS]:
+        name = truncate_name(queue_item.name, 20)
+        rows.append((
+            (f"▶️ {name}", f"ctl:{job_id}:resume:{queue_item.msg_id}"),
+            ("❌", f"ctl:{job_id}:cancel:{queue_item.msg_id}"),
+        ))
+    
+    if state['paused']:
+        job_row = ("▶️ Resume job", f"ctl:{job_id}:resume")
+    else:
+        job_row = ("⏸ Pause job", f"ctl:{job_id}:pause")
+    rows.append((job_row, ("❌ Cancel job", f"ctl:{job_id}:cancel")))
+    return tuple(rows)
+
+def control_keyboard(rows: tuple) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(label, callback_data=data) for label, data in row]
+        for row in rows
+    ])
+
+def truncate_name(name: str, limit: int = 32) -> str:
+    if len(name) <= limit:
+        return name
+    name_parts = name.rsplit('.', 1)
+    if len(name_parts) == 2:
+        base, ext = name_parts
+        return base[:limit - 4] + ".." + "." + ext
+    return name[:limit] + ".."
+
+class ProgressBus:
+    """Wakes a job's renderer when its state changed
+    
+    publish() may be called from pyrogram's progress threads, so the wake-up
+    is handed to the event loop the renderer waits on.
+    """
+    
+    def __init__(self):
+        self.events = 0
+        self._loop = None
+        self._event = None
+    
+    def attach(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        if self.events:
+            self._event.set()
+    
+    def publish(self):
+        self.events += 1
+        if self._loop is None or self._event.is_set():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # Loop already closed
+            pass
+    
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
+
+def publish(state: dict):
+    bus = state.get('bus')
+    if bus:
+        bus.publish()
+
+class StatusView:
+    """Renders a job's state, reusing cached sections that did not change"""
+    
+    def __init__(self, state: dict, job_id: int = None):
+        self.state = state
+        self.job_id = job_id
+        self._sections = {}
+    
+    def _section(self, name, key, build) -> str:
+        cached = self._sections.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+        text = build()
+        self._sections[name] = (key, text)
+        return text
+    
+    def render(self) -> str:
+        state = self.state
+        status = state['status']
+        job_tag = f" #{self.job_id}" if self.job_id else ""
+        
+        if status == 'idle':
+            return "✅ Ready to process"
+        
+        if status == 'queued':
+            return f"<b>⏳ QUEUED{job_tag}</b>\n\nWaiting for a free job slot..."
+        
+        if status == 'fetching':
+            scanned = state.get('scanned', 0)
+            scan_total = state.get('scan_total', 0)
+            scan_pct = (scanned / scan_total * 100) if scan_total > 0 else 0
+            return (
+                f"<b>🔍 SCANNING{job_tag}</b> {scanned}/{scan_total}\n\n"
+                f"{get_progress_bar(scanned, scan_total)} <b>{scan_pct:.0f}%</b>\n"
+                f"<b>📥</b> Files Found: {state.get('found', 0)}"
+            )
+        
+        active = list(state.get('active', {}).values())
+        downloading = sum(1 for t in active if t.phase == 'downloading')
+        uploading = len(active) - downloading
+        dl_speed = sum(t.speed for t in active if t.phase == 'downloading')
+        ul_speed = sum(t.speed for t in active if t.phase != 'downloading')
+        job_stats = state.get('job_stats')
+        
+        title = "⏸ PAUSED" if state.get('paused') else "⚙️ PROCESSING"
+        parts = [
+            f"<b>{title}{job_tag}</b> {state.get('current_index', 0)}/{state.get('to_process', 0)}\n"
+            f"<b>📥</b> {format_bytes(dl_speed)}/s  <b>📤</b> {format_bytes(ul_speed)}/s"
+            f"  <b>⏱</b> {format_eta(job_stats.eta if job_stats else None)}\n"
+        ]
+        
+        if state.get('scanning'):
+            parts.append(f"<b>🔍</b> Scanning {state.get('scanned', 0)}/{state.get('scan_total', 0)}\n")
+        
+        if state.get('disk_wait'):
+            parts.append(f"<b>💽</b> Waiting for disk space ({format_bytes(state['disk_wait'])} needed)\n")
+        
+        # One block per in-flight file
+        for transfer in active:
+            parts.append(self._transfer_block(transfer))
+        
+        held = state.get('held')
+        if held:
+            parts.append(f"\n<b>⏸</b> {len(held)} paused file(s): {truncate_name(held[0].name)}"
+                         f"{' ...' if len(held) > 1 else ''}\n")
+        
+        queue = state.get('queue', [])
+        if queue:
+            # Files leave from anywhere in the window (ADMISSION_ORDER, controls)
+            queue_key = (len(queue), tuple(q.msg_id for q in islice(queue, QUEUE_PREVIEW)))
+            parts.append(self._section('queue', queue_key, lambda: self._queue_section(queue)))
+        
+        processed = state.get('processed', 0)
+        total = state.get('total', 0)
+        skipped = state.get('skipped', 0)
+        counts_key = (
+            processed, downloading, uploading, total, skipped,
+            state.get('to_process', 0), state.get('premium_count', 0)
+        )
+        parts.append(self._section('counts', counts_key, lambda: self._counts_section(*counts_key)))
+        
+        return "".join(parts)
+    
+    @staticmethod
+    def _transfer_block(transfer: TransferStats) -> str:
+        icon = "📥" if transfer.phase == 'downloading' else "📤"
+        current_sz = transfer.current
+        total_sz = transfer.total
+        progress_pct = (current_sz / total_sz * 100) if total_sz > 0 else 0
+        return (
+            f"\n<b>{icon} {truncate_name(transfer.name, 40)}</b>\n"
+            f"{get_progress_bar(current_sz, total_sz)} <b>{progress_pct:.0f}%</b>\n"
+            f"<b>💾</b> {format_bytes(current_sz)} / {format_bytes(total_sz)}"
+            f"  <b>🚀</b> {format_bytes(transfer.speed)}/s  <b>⏱</b> {format_eta(transfer.eta)}\n"
+        )
+    
+    @staticmethod
+    def _queue_section(queue: list) -> str:
+        lines = [f"\n{RULE}\n<b>📋 QUEUE ({len(queue)}+):</b>\n"]
+        
+        # Walk only the previewed records, the window can hold thousands
+        for i, q_file in enumerate(islice(queue, QUEUE_PREVIEW)):
+            q_name = truncate_name(q_file.name)
+            skip_reason = q_file.skip_reason
+            
+            if skip_reason:
+                indicator = f"✗ {q_name} (Skip - {skip_reason})"
+            elif q_file.split:
+                indicator = f"✂️ {q_name} (Split)"
+            elif q_file.premium:
+                indicator = f"⭐ {q_name} (Premium)"
+            else:
+                indicator = f"✓ {q_name}"
+            
+            lines.append(f"  {i+1}. {indicator}\n")
+        
+        if len(queue) > QUEUE_PREVIEW:
+            lines.append(f"  <i>+{len(queue) - QUEUE_PREVIEW} more...</i>")
+        
+        return "".join(lines)
+    
+    @staticmethod
+    def _counts_section(processed, downloading, uploading, total, skipped, to_process, premium_count) -> str:
+        return (
+            f"\n{RULE}\n"
+            f"<b>📈 PROGRESS:</b>\n"
+            f"  ✅ Processed: {processed}\n"
+            f"  ⏳ Currently: {downloading} downloading, {uploading} uploading\n"
+            f"  📌 Remaining: {total - processed - skipped}\n"
+            f"\n<b>📊 FILE COUNTS:</b>\n"
+            f"  📥 Total Found: {total}\n"
+            f"  ✓ To Process: {to_process}\n"
+            f"  ⭐ Premium (>2GB): {premium_count}\n"
+            f"  ✗ Skipped: {skipped}"
+        )
+
+def get_status_text(state: dict, job_id: int = None) -> str:
+    """Real-time progress UI with new design"""
+    return StatusView(state, job_id).render()
+
+class EditBudget:
+    """Status edits per minute shared by every job, paused by FloodWait"""
+    
+    def __init__(self):
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+    
+    def reserve(self) -> float:
+        """Claim the next free edit slot, returns seconds to wait for it"""
+        now = time.monotonic()
+        spacing = 60 / max(1, Config.STATUS_EDITS_PER_MINUTE)
+        slot = max(now, self.next_slot, self.paused_until)
+        self.next_slot = slot + spacing
+        return slot - now
+    
+    def penalize(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+budget = EditBudget()
+
+async def edit_status(message: Message, text: str, reply_markup=None):
+    """One-off status edit (job summaries) through the shared budget"""
+    while True:
+        await asyncio.sleep(budget.reserve())
+        try:
+            await message.edit_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+            return
+        except MessageNotModified:
+            return
+        except FloodWait as e:
+            budget.penalize(e.value)
+
+class StatusRenderer:
+    """Keeps one job's status message in sync with its state
+    
+    Edits happen only after the bus published something, no more often than
+    the current interval and the shared budget allow. A FloodWait pauses
+    every renderer and doubles this one's interval, which then recovers
+    slowly after successful edits.
+    """
+    
+    def __init__(self, message: Message, state: dict, job_id: int = None):
+        self.message = message
+        self.state = state
+        self.job_id = job_id
+        self.view = StatusView(state, job_id)
+        self.bus = state['bus']
+        self.interval = Config.STATUS_UPDATE_INTERVAL
+        self.last_text = None
+        self.last_rows = None
+        self.last_edit = 0.0
+        self.edits = 0
+        self._stopped = asyncio.Event()
+        self._task = None
+    
+    def start(self):
+        if self.message is None:
+            return
+        self.bus.attach()
+        self.bus.publish()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop rendering, waiting for an edit already on its way"""
+        self._stopped.set()
+        if self._task:
+            await self._task
+    
+    async def _sleep(self, delay: float) -> bool:
+        """Sleep unless stopped first, returns False once stopped"""
+        if delay > 0:
+            try:
+                await asyncio.wait_for(self._stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        return not self._stopped.is_set()
+    
+    async def _next_event(self) -> bool:
+        wait_event = asyncio.create_task(self.bus.wait())
+        wait_stop = asyncio.create_task(self._stopped.wait())
+        await asyncio.wait((wait_event, wait_stop), return_when=asyncio.FIRST_COMPLETED)
+        wait_event.cancel()
+        wait_stop.cancel()
+        return not self._stopped.is_set()
+    
+    async def _run(self):
+        while await self._next_event():
+            # Coalesce everything published until the interval has passed
+            if not await self._sleep(self.last_edit + self.interval - time.monotonic()):
+                return
+            if not await self._sleep(budget.reserve()):
+                return
+            
+            text = self.view.render()
+            rows = control_rows(self.state, self.job_id)
+            if text == self.last_text and rows == self.last_rows:
+                continue
+            
+            try:
+                # A stale progress edit is not worth waiting out a FloodWait for
+                with no_flood_retry():
+                    await self.message.edit_text(text, reply_markup=control_keyboard(rows), parse_mode=ParseMode.HTML)
+                self.last_text = text
+                self.last_rows = rows
+                self.edits += 1
+                self.interval = max(Config.STATUS_UPDATE_INTERVAL, self.interval * 0.9)
+            except MessageNotModified:
+                self.last_text = text
+                self.last_rows = rows
+            except FloodWait as e:
+                print(f"FloodWait on status edit: pausing edits for {e.value}s")
+                budget.penalize(e.value)
+                self.interval = min(Config.STATUS_MAX_INTERVAL, self.interval * 2)
+                # Render again once the wait is over
+                self.bus.publish()
+            except Exception as e:
+                print(f"Status edit failed: {e}")
+            
+            self.last_edit = time.monotonic()
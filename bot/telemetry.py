@@ -0,0 +1,129 @@
+"""
+Transfer telemetry - per-file and per-job speed and ETA
+Progress callbacks feed slotted stats objects on a monotonic clock, rates are
+smoothed with a time-weighted EWMA so the status UI and metrics stay steady
+"""
+import math
+import time
+
+_clock = time.monotonic
+
+SAMPLE_INTERVAL = 0.5   # Seconds between rate samples
+SMOOTHING = 4.0         # EWMA time constant in seconds
+
+def _smooth(speed: float, rate: float, elapsed: float) -> float:
+    # Irregular sample spacing - older samples fade with elapsed time, not count
+    if speed == 0:
+        return rate
+    alpha = 1 - math.exp(-elapsed / SMOOTHING)
+    return speed + alpha * (rate - speed)
+
+class JobStats:
+    """Bytes of work (download plus upload per file) for one job"""
+    
+    __slots__ = ('total', 'done', 'speed', 'started', '_sample_time', '_sample_done')
+    
+    def __init__(self):
+        self.total = 0
+        self.done = 0
+        self.speed = 0.0
+        self.started = _clock()
+        self._sample_time = self.started
+        self._sample_done = 0
+    
+    def sample(self, now: float):
+        elapsed = now - self._sample_time
+        if elapsed < SAMPLE_INTERVAL:
+            return
+        self.speed = _smooth(self.speed, (self.done - self._sample_done) / elapsed, elapsed)
+        self._sample_time = now
+        self._sample_done = self.done
+    
+    def settle(self, transfer: 'TransferStats', work: int, completed: bool):
+        """A file left the pipeline - credit its full work or drop what is left"""
+        missing = work - transfer.credited
+        if completed:
+            self.done += missing
+        else:
+            self.total -= missing
+        transfer.credited = work
+    
+    @property
+    def eta(self) -> float | None:
+        if self.speed <= 0:
+            return None
+        return max(0, self.total - self.done) / self.speed
+
+class TransferStats:
+    """Progress of one file through its download and upload phases"""
+    
+    __slots__ = (
+        'name', 'phase', 'current', 'total', 'speed', 'percent', 'credited', 'job',
+        '_sample_time', '_sample_bytes', '_next_percent'
+    )
+    
+    def __init__(self, name: str, job: JobStats = None):
+        self.name = name
+        self.job = job
+        self.credited = 0
+        self.begin('', 0)
+    
+    def begin(self, phase: str, total: int):
+        """Start (or restart) a phase - counters reset, job credit is kept"""
+        self.phase = phase
+        self.current = 0
+        self.total = total
+        self.speed = 0.0
+        self.percent = 0
+        self._sample_time = _clock()
+        self._sample_bytes = 0
+        self._next_percent = self._percent_bytes(1)
+    
+    def _percent_bytes(self, percent: int) -> int:
+        # Smallest byte count that reaches a whole percent
+        return -(-self.total * percent // 100) if self.total else 0
+    
+    def update(self, current: int, total: int = 0) -> bool:
+        """Record progress, returns True when a new whole percent was reached"""
+        delta = current - self.current
+        self.current = current
+        self.credited += delta
+        job = self.job
+        if job is not None:
+            job.done += delta
+        
+        if total > 0 and total != self.total:
+            self.total = total
+            self._next_percent = self._percent_bytes(self.percent + 1)
+        
+        now = _clock()
+        elapsed = now - self._sample_time
+        if elapsed >= SAMPLE_INTERVAL:
+            self.speed = _smooth(self.speed, (current - self._sample_bytes) / elapsed, elapsed)
+            self._sample_time = now
+            self._sample_bytes = current
+            if job is not None:
+                job.sample(now)
+        
+        # Plain comparison per chunk, the division only runs on a new percent
+        if current < self._next_percent or not self.total:
+            return False
+        self.percent = min(100, current * 100 // self.total)
+        self._next_percent = self._percent_bytes(self.percent + 1)
+        return True
+    
+    @property
+    def eta(self) -> float | None:
+        if self.speed <= 0:
+            return None
+        return max(0, self.total - self.current) / self.speed
+
+def format_eta(seconds: float | None) -> str:
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
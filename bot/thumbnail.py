@@ -1,37 +1,159 @@
+"""
+Thumbnails - encoded once off the event loop, served from memory
+Thumbnails live in THUMBNAIL_DIR as <name>.jpg. Each one is decoded, resized
+and JPEG encoded in a worker thread and kept in memory, so uploads never touch
+the filesystem for their thumbnail. THUMBNAIL_RULES picks a thumbnail per
+destination or source channel, "default" is used otherwise.
+"""
+import io
 import os
+import asyncio
+import hashlib
 from PIL import Image
 from bot.config import Config
 
-THUMBNAIL_PATH = os.path.join(Config.THUMBNAIL_DIR, "default_thumb.jpg")
+DEFAULT_THUMBNAIL = "default"
+LEGACY_DEFAULT_THUMBNAIL = "default_thumb"  # Default thumbnail of older versions
+THUMBNAIL_SIZE = (320, 320)
 
-def save_thumbnail(photo_path: str) -> bool:
-    try:
-        os.makedirs(Config.THUMBNAIL_DIR, exist_ok=True)
+class CachedThumb:
+    __slots__ = ('data', 'mtime', 'digest')
+    
+    def __init__(self, data: bytes, mtime: float, digest: str):
+        self.data = data
+        self.mtime = mtime
+        self.digest = digest
+
+# name -> CachedThumb, only changed by the functions below
+_thumbs = {}
+
+def thumbnail_path(name: str) -> str:
+    return os.path.join(Config.THUMBNAIL_DIR, f"{name}.jpg")
+
+def encode_thumbnail(source) -> bytes:
+    """Decode, resize and JPEG encode an image path or file object (blocking)"""
+    with Image.open(source) as img:
+        img = img.convert("RGB")
+        img.thumbnail(THUMBNAIL_SIZE)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+def _store(name: str, data: bytes) -> CachedThumb:
+    os.makedirs(Config.THUMBNAIL_DIR, exist_ok=True)
+    path = thumbnail_path(name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return CachedThumb(data, os.path.getmtime(path), hashlib.sha256(data).hexdigest())
+
+def _scan(cached: dict) -> dict:
+    """Thumbnails on disk, re-reading only files whose mtime changed (blocking)"""
+    found = {}
+    if not os.path.isdir(Config.THUMBNAIL_DIR):
+        return found
+    
+    # A default thumbnail set by an older version becomes the default
+    legacy = thumbnail_path(LEGACY_DEFAULT_THUMBNAIL)
+    if os.path.isfile(legacy) and not os.path.exists(thumbnail_path(DEFAULT_THUMBNAIL)):
+        try:
+            os.replace(legacy, thumbnail_path(DEFAULT_THUMBNAIL))
+        except OSError as e:
+            print(f"Error renaming {legacy}: {e}")
+    
+    for entry in os.scandir(Config.THUMBNAIL_DIR):
+        name, ext = os.path.splitext(entry.name)
+        if ext.lower() != ".jpg" or not entry.is_file():
+            continue
+        
+        mtime = entry.stat().st_mtime
+        thumb = cached.get(name)
+        if thumb and thumb.mtime == mtime:
+            found[name] = thumb
+            continue
         
-        with Image.open(photo_path) as img:
-            img = img.convert("RGB")
-            img.thumbnail((320, 320))
-            img.save(THUMBNAIL_PATH, "JPEG", quality=85)
+        with open(entry.path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if thumb and thumb.digest == digest:
+            # Touched but not changed
+            thumb.mtime = mtime
+            found[name] = thumb
+            continue
         
+        try:
+            # Files dropped in by hand may be any size or format
+            data = encode_thumbnail(io.BytesIO(raw))
+        except Exception as e:
+            print(f"Error loading thumbnail {entry.name}: {e}")
+            continue
+        found[name] = CachedThumb(data, mtime, digest)
+    return found
+
+async def refresh_thumbnails() -> int:
+    """Sync the cache with THUMBNAIL_DIR, returns the number of thumbnails"""
+    loop = asyncio.get_running_loop()
+    found = await loop.run_in_executor(None, _scan, dict(_thumbs))
+    _thumbs.clear()
+    _thumbs.update(found)
+    return len(_thumbs)
+
+async def save_thumbnail(photo, name: str = DEFAULT_THUMBNAIL) -> bool:
+    """Encode a photo (path or file object) and store it as thumbnail name"""
+    loop = asyncio.get_running_loop()
+    try:
+        data = await loop.run_in_executor(None, encode_thumbnail, photo)
+        _thumbs[name] = await loop.run_in_executor(None, _store, name, data)
         return True
     except Exception as e:
         print(f"Error saving thumbnail: {e}")
         return False
 
-def get_thumbnail() -> str | None:
-    if os.path.exists(THUMBNAIL_PATH):
-        return THUMBNAIL_PATH
-    return None
-
-def delete_thumbnail() -> bool:
-    try:
-        if os.path.exists(THUMBNAIL_PATH):
-            os.remove(THUMBNAIL_PATH)
-            return True
+async def delete_thumbnail(name: str = DEFAULT_THUMBNAIL) -> bool:
+    if _thumbs.pop(name, None) is None:
         return False
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, os.remove, thumbnail_path(name))
+    except FileNotFoundError:
+        pass
     except Exception as e:
         print(f"Error deleting thumbnail: {e}")
-        return False
+    return True
+
+def thumbnail_name(source_id: int = None, dest_id: int = None) -> str | None:
+    """Thumbnail for an upload - destination rule, then source rule, then default"""
+    rules = Config.THUMBNAIL_RULES
+    for key in (f"dest:{dest_id}", f"source:{source_id}"):
+        name = rules.get(key)
+        if name in _thumbs:
+            return name
+    return DEFAULT_THUMBNAIL if DEFAULT_THUMBNAIL in _thumbs else None
+
+def group_by_thumbnail(source_id: int, destinations: list) -> list[list]:
+    """Destinations split by the thumbnail their uploads use, in order
+    
+    A re-post by file_id keeps the thumbnail of the upload it came from, so
+    only destinations within one group can share an upload.
+    """
+    groups = {}
+    for dest_id in destinations:
+        groups.setdefault(thumbnail_name(source_id, dest_id), []).append(dest_id)
+    return list(groups.values())
+
+def get_thumbnail(source_id: int = None, dest_id: int = None) -> io.BytesIO | None:
+    """In-memory thumbnail file for one upload, or None
+    
+    Every call returns its own file object, so concurrent uploads never share
+    a read position.
+    """
+    name = thumbnail_name(source_id, dest_id)
+    if name is None:
+        return None
+    thumb = io.BytesIO(_thumbs[name].data)
+    thumb.name = f"{name}.jpg"
+    return thumb
+
+def has_thumbnail(name: str = DEFAULT_THUMBNAIL) -> bool:
+    return name in _thumbs
 
-def has_thumbnail() -> bool:
-    return os.path.exists(THUMBNAIL_PATH)
+def list_thumbnails() -> list:
+    return sorted(_thumbs)
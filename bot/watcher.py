@@ -0,0 +1,172 @@
+"""
+Watch mode - new posts in the source channels are processed automatically
+Posts are collected per source channel into a batch that is only a message
+ID range, flushed as a regular range job once WATCH_BATCH_SIZE posts arrived
+or WATCH_DEBOUNCE seconds passed without a new one. While an earlier batch of
+the same channel is still queued, or a destination is in a FloodWait, the
+batch keeps growing instead of queueing more jobs.
+"""
+import time
+import asyncio
+from pyrogram import filters
+from pyrogram.client import Client
+from pyrogram.types import Message
+from bot.config import Config
+from bot.database import get_setting, update_setting
+from bot.filters import has_downloadable_media
+from bot.jobs import manager
+from bot.ratelimit import limiter
+
+# Last message ID handed to a job, per source channel (survives restarts)
+WATERMARK_KEY = "WATCH_LAST_IDS"
+
+def is_watched(_, __, message: Message) -> bool:
+    return (
+        Config.WATCH_MODE
+        and message.chat is not None
+        and message.chat.id in Config.SOURCE_CHANNEL_IDS
+        and has_downloadable_media(message)
+    )
+
+watched_filter = filters.create(is_watched)
+
+def message_link(chat_id: int, msg_id: int) -> str:
+    return f"https://t.me/c/{str(chat_id).removeprefix('-100')}/{msg_id}"
+
+class WatchBatch:
+    __slots__ = ('first_id', 'last_id', 'posts', 'first_at', 'last_at')
+    
+    def __init__(self, first_id: int, now: float):
+        self.first_id = first_id
+        self.last_id = first_id
+        self.posts = 0
+        self.first_at = now
+        self.last_at = now
+    
+    def add(self, msg_id: int, now: float):
+        self.first_id = min(self.first_id, msg_id)
+        self.last_id = max(self.last_id, msg_id)
+        self.posts += 1
+        self.last_at = now
+    
+    def ready(self, now: float) -> bool:
+        return (
+            self.posts >= Config.WATCH_BATCH_SIZE
+            or now - self.last_at >= Config.WATCH_DEBOUNCE
+            or now - self.first_at >= Config.WATCH_MAX_DELAY
+        )
+
+class Watcher:
+    def __init__(self):
+        self.client = None
+        self.batches = {}
+        self.jobs = {}
+        self.watermarks = {}
+        self._wake = asyncio.Event()
+        self._task = None
+    
+    def register(self, app: Client):
+        @app.on_message(watched_filter)
+        async def on_source_post(client, message: Message):
+            self.add(message)
+    
+    async def start(self, app: Client):
+        self.client = app
+        self.watermarks = dict(await get_setting(WATERMARK_KEY, {}))
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    def add(self, message: Message):
+        chat_id = message.chat.id
+        now = time.monotonic()
+        batch = self.batches.get(chat_id)
+        if batch is None:
+            # After a restart the first batch also covers posts missed meanwhile
+            last_id = self.watermarks.get(str(chat_id))
+            first_id = last_id + 1 if last_id and last_id < message.id else message.id
+            batch = self.batches[chat_id] = WatchBatch(first_id, now)
+        batch.add(message.id, now)
+        if batch.posts >= Config.WATCH_BATCH_SIZE:
+            self._wake.set()
+    
+    def backpressure(self, chat_id: int) -> float:
+        """Seconds to hold a batch back, 0 when it can be queued now"""
+        job = self.jobs.get(chat_id)
+        if job and job in manager.pending:
+            # Previous batch not started yet, keep growing this one
+            return Config.WATCH_DEBOUNCE
+        now = time.monotonic()
+        return max(
+            [limiter.penalties.get(('chat', dest), 0) - now for dest in Config.DESTINATION_CHANNEL_IDS],
+            default=0
+        )
+    
+    async def flush(self, chat_id: int, batch: WatchBatch):
+        # Posts arriving while the job is submitted start the next batch
+        del self.batches[chat_id]
+        key = str(chat_id)
+        previous = self.watermarks.get(key)
+        self.watermarks[key] = batch.last_id
+        
+        print(f"👀 {batch.posts} new post(s) in {chat_id}: queueing {batch.first_id}-{batch.last_id}")
+        try:
+            self.jobs[chat_id] = await manager.submit(
+                self.client,
+                message_link(chat_id, batch.first_id),
+                message_link(chat_id, batch.last_id),
+                None,
+                priority=Config.WATCH_PRIORITY
+            )
+        except Exception:
+            # Put the posts back in front of anything that arrived meanwhile
+            self.watermarks[key] = previous
+            newer = self.batches.get(chat_id)
+            if newer:
+                newer.first_id = min(newer.first_id, batch.first_id)
+                newer.posts += batch.posts
+                newer.first_at = batch.first_at
+            else:
+                self.batches[chat_id] = batch
+            raise
+        await update_setting(WATERMARK_KEY, dict(self.watermarks))
+    
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            next_check = Config.WATCH_DEBOUNCE
+            for chat_id, batch in list(self.batches.items()):
+                if not batch.ready(now):
+                    next_check = min(
+                        next_check,
+                        batch.last_at + Config.WATCH_DEBOUNCE - now,
+                        batch.first_at + Config.WATCH_MAX_DELAY - now
+                    )
+                    continue
+                
+                delay = self.backpressure(chat_id)
+                if delay > 0:
+                    next_check = min(next_check, delay)
+                    continue
+                
+                try:
+                    await self.flush(chat_id, batch)
+                except Exception as e:
+                    print(f"Could not queue watched posts of {chat_id}: {e}")
+            
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.1, next_check))
+            except asyncio.TimeoutError:
+                pass
+    
+    async def reset(self):
+        """Forget pending posts and watermarks, watching restarts from the next post"""
+        self.batches.clear()
+        self.watermarks = {}
+        await update_setting(WATERMARK_KEY, {})
+
+watcher = Watcher()
@@ -8,7 +8,12 @@ import time
 from pyrogram.errors import FloodWait, UnauthorizedError
 from bot.config import Config
 from bot.client import app
-from bot.handlers import register_handlers
+from bot.handlers import register_handlers, notify_unfinished_jobs
+from bot.database import load_settings_sync, start_flusher, stop_flusher
+from bot.sessions import pool
+from bot.thumbnail import refresh_thumbnails
+from bot.metrics import server as metrics_server
+from bot.watcher import watcher
 
 async def start_bot():
     """Start bot with robust error handling"""
@@ -22,13 +27,26 @@ async def start_bot():
             
             # Connect to Telegram
             await app.start()
+            start_flusher()
+            await pool.start(app)
+            print(f"🖼️ {await refresh_thumbnails()} thumbnail(s) cached")
+            await metrics_server.start()
+            await watcher.start(app)
             print("✅ Bot connected successfully!")
             print("=" * 50)
             print("🚀 Bot is running and ready for commands")
             print("=" * 50)
             
+            await notify_unfinished_jobs(app)
+            
             # Idle (wait for messages)
-            await app.idle()
+            try:
+                await app.idle()
+            finally:
+                await watcher.stop()
+                await metrics_server.stop()
+                await pool.stop()
+                await stop_flusher()
             return
             
         except FloodWait as e:
@@ -82,8 +100,13 @@ def main():
     print(f"   Bot Token: ****** (set)")
     print(f"   Owner ID: {Config.OWNER_ID}\n")
     
+    # Load persisted settings into Config
+    settings = load_settings_sync()
+    print(f"   Settings: {len(settings)} loaded from {Config.DATABASE_PATH}\n")
+    
     # Register command handlers
     register_handlers(app)
+    watcher.register(app)
     
     print("Starting bot...")
     